@@ -1,1378 +1,2112 @@
-"""
-Database module for MCAT Trainer
-Uses SQLite for persistence
-"""
-
-import sqlite3
-import json
-import os
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Optional, List, Dict, Any
-from contextlib import contextmanager
-
-# Database path - use environment variable or default
-DB_PATH = os.environ.get("DATABASE_PATH", "mcat_trainer.db")
-
-
-def get_db_path():
-    """Get the database path, creating directory if needed."""
-    db_path = Path(DB_PATH)
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    return str(db_path)
-
-
-@contextmanager
-def get_connection():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
-
-
-def init_db():
-    """Initialize the database schema."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Users table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Questions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS questions (
-                id TEXT PRIMARY KEY,
-                subject TEXT NOT NULL,
-                chapter INTEGER NOT NULL,
-                chapter_title TEXT NOT NULL,
-                question_number INTEGER NOT NULL,
-                question_text TEXT NOT NULL,
-                options TEXT NOT NULL,
-                correct_answer TEXT NOT NULL,
-                explanation TEXT NOT NULL,
-                short_reason TEXT,
-                wrong_answer_explanations TEXT,
-                image_filename TEXT,
-                learn_with_ai TEXT
-            )
-        """)
-
-        # Sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ended_at TIMESTAMP,
-                total_questions INTEGER DEFAULT 0,
-                correct_count INTEGER DEFAULT 0,
-                subjects TEXT,
-                mode TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Attempts table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                question_id TEXT NOT NULL,
-                session_id INTEGER,
-                correct BOOLEAN NOT NULL,
-                selected_answer TEXT,
-                time_taken_seconds REAL,
-                timed_out BOOLEAN DEFAULT FALSE,
-                answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                error_type TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (question_id) REFERENCES questions(id),
-                FOREIGN KEY (session_id) REFERENCES sessions(id)
-            )
-        """)
-
-        # Create indexes for performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_question ON attempts(question_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_session ON attempts(session_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions(subject)")
-
-        # Flashcards table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS flashcards (
-                id TEXT PRIMARY KEY,
-                subject TEXT NOT NULL,
-                chapter INTEGER NOT NULL,
-                chapter_title TEXT NOT NULL,
-                term TEXT NOT NULL,
-                definition TEXT NOT NULL,
-                mnemonic TEXT,
-                category TEXT
-            )
-        """)
-
-        # Flashcard sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS flashcard_sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ended_at TIMESTAMP,
-                total_cards INTEGER DEFAULT 0,
-                correct_count INTEGER DEFAULT 0,
-                subjects TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Flashcard reviews table (spaced repetition tracking)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS flashcard_reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                flashcard_id TEXT NOT NULL,
-                session_id INTEGER,
-                correct BOOLEAN NOT NULL,
-                time_taken_seconds REAL,
-                reviewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ease_factor REAL DEFAULT 2.5,
-                interval_days INTEGER DEFAULT 1,
-                next_review_date DATE,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (flashcard_id) REFERENCES flashcards(id),
-                FOREIGN KEY (session_id) REFERENCES flashcard_sessions(id)
-            )
-        """)
-
-        # Create flashcard indexes
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_subject ON flashcards(subject)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_user ON flashcard_reviews(user_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_flashcard ON flashcard_reviews(flashcard_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_next ON flashcard_reviews(user_id, next_review_date)")
-
-        # Migration: Add learn_with_ai column if it doesn't exist
-        cursor.execute("PRAGMA table_info(questions)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'learn_with_ai' not in columns:
-            cursor.execute("ALTER TABLE questions ADD COLUMN learn_with_ai TEXT")
-
-        # Migration: Add error_type column to attempts if it doesn't exist
-        cursor.execute("PRAGMA table_info(attempts)")
-        attempt_columns = [col[1] for col in cursor.fetchall()]
-        if 'error_type' not in attempt_columns:
-            cursor.execute("ALTER TABLE attempts ADD COLUMN error_type TEXT")
-
-        # Study streaks table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS study_streaks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL UNIQUE,
-                current_streak INTEGER DEFAULT 0,
-                longest_streak INTEGER DEFAULT 0,
-                last_study_date DATE,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Daily goals table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS daily_goals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL UNIQUE,
-                daily_question_goal INTEGER DEFAULT 30,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            )
-        """)
-
-        # Question review schedule table (for spaced repetition of missed questions)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS question_reviews (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                question_id TEXT NOT NULL,
-                scheduled_date DATE NOT NULL,
-                review_type TEXT NOT NULL,
-                completed BOOLEAN DEFAULT FALSE,
-                completed_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id),
-                FOREIGN KEY (question_id) REFERENCES questions(id)
-            )
-        """)
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_question_reviews_user_date ON question_reviews(user_id, scheduled_date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_question_reviews_question ON question_reviews(question_id)")
-
-        # Create default users (Brandon and Porter)
-        cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", ("Brandon",))
-        cursor.execute("INSERT OR IGNORE INTO users (name) VALUES (?)", ("Porter",))
-
-
-def load_questions_from_json():
-    """Load questions from JSON files into the database."""
-    data_dir = Path(__file__).parent / "data"
-
-    subject_files = {
-        "Biology": "mcat_biology_questions.json",
-        "Biochemistry": "mcat_biochemistry_questions.json",
-        "Behavioral Sciences": "mcat_behavioral_sciences_questions.json",
-        "General Chemistry": "mcat_general_chemistry_questions.json",
-        "Organic Chemistry": "mcat_organic_chemistry_questions.json",
-        "Physics and Math": "mcat_physics_math_questions.json",
-    }
-
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        for subject, filename in subject_files.items():
-            filepath = data_dir / filename
-            if not filepath.exists():
-                print(f"Warning: {filename} not found")
-                continue
-
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            for q in data.get("questions", []):
-                # Create unique ID with subject prefix
-                question_id = f"{subject.lower().replace(' ', '_')}_{q['id']}"
-
-                cursor.execute("""
-                    INSERT OR REPLACE INTO questions
-                    (id, subject, chapter, chapter_title, question_number,
-                     question_text, options, correct_answer, explanation,
-                     short_reason, wrong_answer_explanations, image_filename, learn_with_ai)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    question_id,
-                    subject,
-                    q['chapter'],
-                    q['chapter_title'],
-                    q['question_number'],
-                    q['question_text'],
-                    json.dumps(q['options']),
-                    q['correct_answer'],
-                    q['explanation'],
-                    q.get('short_reason', ''),
-                    json.dumps(q.get('wrong_answer_explanations', {})),
-                    q.get('image_filename', ''),
-                    json.dumps(q.get('learn_with_ai', {}))
-                ))
-
-        # Get count
-        cursor.execute("SELECT COUNT(*) FROM questions")
-        count = cursor.fetchone()[0]
-        print(f"Loaded {count} questions into database")
-
-
-# User operations
-def get_all_users() -> List[Dict[str, Any]]:
-    """Get all users."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, created_at FROM users ORDER BY name")
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
-    """Get a user by ID."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, name, created_at FROM users WHERE id = ?", (user_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
-
-
-def create_user(name: str) -> Dict[str, Any]:
-    """Create a new user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (name) VALUES (?)", (name,))
-        user_id = cursor.lastrowid
-        return {"id": user_id, "name": name}
-
-
-# Question operations
-def get_question_by_id(question_id: str) -> Optional[Dict[str, Any]]:
-    """Get a question by ID."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM questions WHERE id = ?", (question_id,))
-        row = cursor.fetchone()
-        if row:
-            q = dict(row)
-            q['options'] = json.loads(q['options'])
-            # Parse wrong_answer_explanations JSON if present
-            if q.get('wrong_answer_explanations'):
-                try:
-                    q['wrong_answer_explanations'] = json.loads(q['wrong_answer_explanations'])
-                except (json.JSONDecodeError, TypeError):
-                    q['wrong_answer_explanations'] = {}
-            else:
-                q['wrong_answer_explanations'] = {}
-            # Parse learn_with_ai JSON if present
-            if q.get('learn_with_ai'):
-                try:
-                    q['learn_with_ai'] = json.loads(q['learn_with_ai'])
-                except (json.JSONDecodeError, TypeError):
-                    q['learn_with_ai'] = {}
-            else:
-                q['learn_with_ai'] = {}
-            return q
-        return None
-
-
-def get_all_questions(subject: Optional[str] = None) -> List[Dict[str, Any]]:
-    """Get all questions, optionally filtered by subject."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        if subject:
-            cursor.execute("SELECT * FROM questions WHERE subject = ?", (subject,))
-        else:
-            cursor.execute("SELECT * FROM questions")
-        questions = []
-        for row in cursor.fetchall():
-            q = dict(row)
-            q['options'] = json.loads(q['options'])
-            # Parse wrong_answer_explanations JSON if present
-            if q.get('wrong_answer_explanations'):
-                try:
-                    q['wrong_answer_explanations'] = json.loads(q['wrong_answer_explanations'])
-                except (json.JSONDecodeError, TypeError):
-                    q['wrong_answer_explanations'] = {}
-            else:
-                q['wrong_answer_explanations'] = {}
-            # Parse learn_with_ai JSON if present
-            if q.get('learn_with_ai'):
-                try:
-                    q['learn_with_ai'] = json.loads(q['learn_with_ai'])
-                except (json.JSONDecodeError, TypeError):
-                    q['learn_with_ai'] = {}
-            else:
-                q['learn_with_ai'] = {}
-            questions.append(q)
-        return questions
-
-
-def get_subjects() -> List[str]:
-    """Get list of all subjects."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT subject FROM questions ORDER BY subject")
-        return [row[0] for row in cursor.fetchall()]
-
-
-# Session operations
-def create_session(user_id: int, mode: str, subjects: List[str], total_questions: int) -> int:
-    """Create a new study session."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO sessions (user_id, mode, subjects, total_questions)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, mode, json.dumps(subjects), total_questions))
-        return cursor.lastrowid
-
-
-def get_session(session_id: int) -> Optional[Dict[str, Any]]:
-    """Get a session by ID."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        if row:
-            s = dict(row)
-            s['subjects'] = json.loads(s['subjects']) if s['subjects'] else []
-            return s
-        return None
-
-
-def update_session(session_id: int, correct_count: int, ended: bool = False):
-    """Update session statistics."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        if ended:
-            cursor.execute("""
-                UPDATE sessions
-                SET correct_count = ?, ended_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (correct_count, session_id))
-        else:
-            cursor.execute("""
-                UPDATE sessions SET correct_count = ? WHERE id = ?
-            """, (correct_count, session_id))
-
-
-def get_user_sessions(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-    """Get recent sessions for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM sessions
-            WHERE user_id = ?
-            ORDER BY started_at DESC
-            LIMIT ?
-        """, (user_id, limit))
-        sessions = []
-        for row in cursor.fetchall():
-            s = dict(row)
-            s['subjects'] = json.loads(s['subjects']) if s['subjects'] else []
-            sessions.append(s)
-        return sessions
-
-
-# Attempt operations
-def record_attempt(user_id: int, question_id: str, session_id: int,
-                   correct: bool, selected_answer: str,
-                   time_taken_seconds: float, timed_out: bool = False,
-                   error_type: str = None):
-    """Record a question attempt."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO attempts
-            (user_id, question_id, session_id, correct, selected_answer,
-             time_taken_seconds, timed_out, error_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, question_id, session_id, correct, selected_answer,
-              time_taken_seconds, timed_out, error_type))
-
-    # Schedule reviews AFTER the connection is closed to avoid nested connections
-    # SQLite doesn't handle concurrent writes well
-    if not correct:
-        schedule_question_review(user_id, question_id, 1, 'day_1')
-        schedule_question_review(user_id, question_id, 7, 'day_7')
-
-
-def get_session_attempts(session_id: int) -> List[Dict[str, Any]]:
-    """Get all attempts for a session."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT a.*, q.subject, q.chapter, q.chapter_title
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.session_id = ?
-            ORDER BY a.answered_at
-        """, (session_id,))
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_topic_accuracy(user_id: int) -> Dict[str, Dict[str, Any]]:
-    """Get accuracy statistics by topic for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                q.subject,
-                q.chapter,
-                q.chapter_title,
-                SUM(CASE WHEN a.correct THEN 1 ELSE 0 END) as correct,
-                COUNT(*) as total,
-                JULIANDAY('now') - JULIANDAY(MAX(a.answered_at)) as days_since
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ?
-            GROUP BY q.subject, q.chapter
-        """, (user_id,))
-
-        results = {}
-        for row in cursor.fetchall():
-            key = f"{row['subject']}_{row['chapter']}"
-            results[key] = {
-                "subject": row['subject'],
-                "chapter": row['chapter'],
-                "chapter_title": row['chapter_title'],
-                "correct": row['correct'],
-                "total": row['total'],
-                "accuracy": row['correct'] / row['total'] if row['total'] > 0 else 0,
-                "days_since_last": row['days_since'] or 0
-            }
-        return results
-
-
-def get_user_stats(user_id: int) -> Dict[str, Any]:
-    """Get overall statistics for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Overall stats
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_attempts,
-                SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct_attempts,
-                AVG(time_taken_seconds) as avg_time
-            FROM attempts WHERE user_id = ?
-        """, (user_id,))
-        overall = dict(cursor.fetchone())
-
-        # Stats by subject
-        cursor.execute("""
-            SELECT
-                q.subject,
-                COUNT(*) as total,
-                SUM(CASE WHEN a.correct THEN 1 ELSE 0 END) as correct
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ?
-            GROUP BY q.subject
-        """, (user_id,))
-        by_subject = {row['subject']: {
-            "total": row['total'],
-            "correct": row['correct'],
-            "accuracy": row['correct'] / row['total'] if row['total'] > 0 else 0
-        } for row in cursor.fetchall()}
-
-        # Recent trend (last 7 days)
-        cursor.execute("""
-            SELECT
-                DATE(answered_at) as date,
-                COUNT(*) as total,
-                SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct
-            FROM attempts
-            WHERE user_id = ? AND answered_at >= DATE('now', '-7 days')
-            GROUP BY DATE(answered_at)
-            ORDER BY date
-        """, (user_id,))
-        trend = [dict(row) for row in cursor.fetchall()]
-
-        # Session count
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM sessions WHERE user_id = ?
-        """, (user_id,))
-        session_count = cursor.fetchone()['count']
-
-        return {
-            "total_attempts": overall['total_attempts'] or 0,
-            "correct_attempts": overall['correct_attempts'] or 0,
-            "accuracy": (overall['correct_attempts'] / overall['total_attempts'] * 100) if overall['total_attempts'] else 0,
-            "avg_time_seconds": overall['avg_time'] or 0,
-            "by_subject": by_subject,
-            "recent_trend": trend,
-            "session_count": session_count
-        }
-
-
-def get_questions_asked_in_session(session_id: int) -> List[str]:
-    """Get list of question IDs already asked in a session."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT question_id FROM attempts WHERE session_id = ?
-        """, (session_id,))
-        return [row[0] for row in cursor.fetchall()]
-
-
-def get_recent_question_ids(user_id: int, limit: int = 50) -> List[str]:
-    """Get recently asked question IDs for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT question_id FROM attempts
-            WHERE user_id = ?
-            ORDER BY answered_at DESC
-            LIMIT ?
-        """, (user_id, limit))
-        return [row[0] for row in cursor.fetchall()]
-
-
-def load_flashcards_from_json():
-    """Load flashcards from JSON files into the database."""
-    data_dir = Path(__file__).parent / "data" / "flashcards"
-
-    if not data_dir.exists():
-        print(f"Warning: Flashcards directory not found at {data_dir}")
-        return
-
-    flashcard_files = list(data_dir.glob("flashcards_*.json"))
-
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        total_loaded = 0
-        for filepath in flashcard_files:
-            if filepath.name == "flashcards_summary.json":
-                continue
-
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-
-                for fc in data.get("flashcards", []):
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO flashcards
-                        (id, subject, chapter, chapter_title, term, definition, mnemonic, category)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        fc['id'],
-                        fc['subject'],
-                        fc['chapter'],
-                        fc['chapter_title'],
-                        fc['term'],
-                        fc['definition'],
-                        fc.get('mnemonic', ''),
-                        fc.get('category', 'general')
-                    ))
-                    total_loaded += 1
-
-                print(f"Loaded {len(data.get('flashcards', []))} flashcards from {filepath.name}")
-            except Exception as e:
-                print(f"Error loading {filepath}: {e}")
-
-        print(f"Total flashcards loaded: {total_loaded}")
-
-
-# Flashcard operations
-def get_flashcard_by_id(flashcard_id: str) -> Optional[Dict[str, Any]]:
-    """Get a flashcard by ID."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM flashcards WHERE id = ?", (flashcard_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
-
-
-def get_all_flashcards(subject: Optional[str] = None, chapter: Optional[int] = None) -> List[Dict[str, Any]]:
-    """Get all flashcards, optionally filtered by subject and/or chapter."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        query = "SELECT * FROM flashcards WHERE 1=1"
-        params = []
-
-        if subject:
-            query += " AND subject = ?"
-            params.append(subject)
-        if chapter:
-            query += " AND chapter = ?"
-            params.append(chapter)
-
-        query += " ORDER BY subject, chapter, id"
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_flashcard_subjects() -> List[str]:
-    """Get list of all flashcard subjects."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT subject FROM flashcards ORDER BY subject")
-        return [row[0] for row in cursor.fetchall()]
-
-
-def get_flashcard_chapters(subject: str) -> List[Dict[str, Any]]:
-    """Get chapters available for a subject with flashcard counts."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT chapter, chapter_title, COUNT(*) as count
-            FROM flashcards
-            WHERE subject = ?
-            GROUP BY chapter
-            ORDER BY chapter
-        """, (subject,))
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_flashcard_count(subject: Optional[str] = None, chapter: Optional[int] = None) -> int:
-    """Get count of flashcards."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        query = "SELECT COUNT(*) FROM flashcards WHERE 1=1"
-        params = []
-
-        if subject:
-            query += " AND subject = ?"
-            params.append(subject)
-        if chapter:
-            query += " AND chapter = ?"
-            params.append(chapter)
-
-        cursor.execute(query, params)
-        return cursor.fetchone()[0]
-
-
-# Flashcard session operations
-def create_flashcard_session(user_id: int, subjects: List[str], total_cards: int) -> int:
-    """Create a new flashcard study session."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO flashcard_sessions (user_id, subjects, total_cards)
-            VALUES (?, ?, ?)
-        """, (user_id, json.dumps(subjects), total_cards))
-        return cursor.lastrowid
-
-
-def get_flashcard_session(session_id: int) -> Optional[Dict[str, Any]]:
-    """Get a flashcard session by ID."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM flashcard_sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        if row:
-            s = dict(row)
-            s['subjects'] = json.loads(s['subjects']) if s['subjects'] else []
-            return s
-        return None
-
-
-def update_flashcard_session(session_id: int, correct_count: int, ended: bool = False):
-    """Update flashcard session statistics."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        if ended:
-            cursor.execute("""
-                UPDATE flashcard_sessions
-                SET correct_count = ?, ended_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (correct_count, session_id))
-        else:
-            cursor.execute("""
-                UPDATE flashcard_sessions SET correct_count = ? WHERE id = ?
-            """, (correct_count, session_id))
-
-
-# Flashcard review operations (spaced repetition)
-def record_flashcard_review(user_id: int, flashcard_id: str, session_id: int,
-                            correct: bool, time_taken_seconds: float):
-    """Record a flashcard review with spaced repetition calculations."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Get the last review for this flashcard to calculate new interval
-        cursor.execute("""
-            SELECT ease_factor, interval_days
-            FROM flashcard_reviews
-            WHERE user_id = ? AND flashcard_id = ?
-            ORDER BY reviewed_at DESC
-            LIMIT 1
-        """, (user_id, flashcard_id))
-        last_review = cursor.fetchone()
-
-        if last_review:
-            ease_factor = last_review['ease_factor']
-            interval = last_review['interval_days']
-        else:
-            ease_factor = 2.5
-            interval = 1
-
-        # SM-2 algorithm for spaced repetition
-        if correct:
-            if interval == 1:
-                interval = 6
-            else:
-                interval = int(interval * ease_factor)
-            ease_factor = max(1.3, ease_factor + 0.1)
-        else:
-            interval = 1
-            ease_factor = max(1.3, ease_factor - 0.2)
-
-        # Calculate next review date
-        next_review = f"DATE('now', '+{interval} days')"
-
-        cursor.execute(f"""
-            INSERT INTO flashcard_reviews
-            (user_id, flashcard_id, session_id, correct, time_taken_seconds,
-             ease_factor, interval_days, next_review_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?, {next_review})
-        """, (user_id, flashcard_id, session_id, correct, time_taken_seconds,
-              ease_factor, interval))
-
-
-def get_due_flashcards(user_id: int, subject: Optional[str] = None,
-                       limit: int = 20) -> List[Dict[str, Any]]:
-    """Get flashcards that are due for review (spaced repetition)."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # First get cards due for review
-        query = """
-            SELECT DISTINCT f.*, fr.next_review_date, fr.ease_factor, fr.interval_days
-            FROM flashcards f
-            LEFT JOIN (
-                SELECT flashcard_id, next_review_date, ease_factor, interval_days,
-                       ROW_NUMBER() OVER (PARTITION BY flashcard_id ORDER BY reviewed_at DESC) as rn
-                FROM flashcard_reviews
-                WHERE user_id = ?
-            ) fr ON f.id = fr.flashcard_id AND fr.rn = 1
-            WHERE (fr.next_review_date IS NULL OR fr.next_review_date <= DATE('now'))
-        """
-        params = [user_id]
-
-        if subject:
-            query += " AND f.subject = ?"
-            params.append(subject)
-
-        # Order: due cards first (by date), then new cards
-        query += " ORDER BY fr.next_review_date IS NULL, fr.next_review_date LIMIT ?"
-        params.append(limit)
-
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_flashcard_stats(user_id: int) -> Dict[str, Any]:
-    """Get flashcard statistics for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Overall stats
-        cursor.execute("""
-            SELECT
-                COUNT(*) as total_reviews,
-                SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct_reviews,
-                AVG(time_taken_seconds) as avg_time
-            FROM flashcard_reviews
-            WHERE user_id = ?
-        """, (user_id,))
-        overall = dict(cursor.fetchone())
-
-        # Cards mastered (interval >= 21 days)
-        cursor.execute("""
-            SELECT COUNT(DISTINCT flashcard_id) as mastered
-            FROM flashcard_reviews
-            WHERE user_id = ? AND interval_days >= 21
-        """, (user_id,))
-        mastered = cursor.fetchone()['mastered']
-
-        # Cards in learning
-        cursor.execute("""
-            SELECT COUNT(DISTINCT flashcard_id) as learning
-            FROM flashcard_reviews
-            WHERE user_id = ? AND interval_days < 21
-        """, (user_id,))
-        learning = cursor.fetchone()['learning']
-
-        # Total cards available
-        cursor.execute("SELECT COUNT(*) FROM flashcards")
-        total_cards = cursor.fetchone()[0]
-
-        # Cards due today
-        cursor.execute("""
-            SELECT COUNT(DISTINCT fr.flashcard_id) as due_count
-            FROM flashcard_reviews fr
-            INNER JOIN (
-                SELECT flashcard_id, MAX(reviewed_at) as max_review
-                FROM flashcard_reviews
-                WHERE user_id = ?
-                GROUP BY flashcard_id
-            ) latest ON fr.flashcard_id = latest.flashcard_id
-                     AND fr.reviewed_at = latest.max_review
-            WHERE fr.user_id = ?
-              AND fr.next_review_date <= DATE('now')
-        """, (user_id, user_id))
-        due_today = cursor.fetchone()['due_count']
-
-        # New cards (never reviewed)
-        cursor.execute("""
-            SELECT COUNT(*) as new_cards
-            FROM flashcards f
-            WHERE NOT EXISTS (
-                SELECT 1 FROM flashcard_reviews fr
-                WHERE fr.flashcard_id = f.id AND fr.user_id = ?
-            )
-        """, (user_id,))
-        new_cards = cursor.fetchone()['new_cards']
-
-        # Stats by subject
-        cursor.execute("""
-            SELECT
-                f.subject,
-                COUNT(DISTINCT fr.flashcard_id) as reviewed,
-                SUM(CASE WHEN fr.correct THEN 1 ELSE 0 END) as correct,
-                COUNT(*) as total_reviews
-            FROM flashcard_reviews fr
-            JOIN flashcards f ON fr.flashcard_id = f.id
-            WHERE fr.user_id = ?
-            GROUP BY f.subject
-        """, (user_id,))
-        by_subject = {row['subject']: {
-            "reviewed": row['reviewed'],
-            "correct": row['correct'],
-            "total_reviews": row['total_reviews'],
-            "accuracy": row['correct'] / row['total_reviews'] if row['total_reviews'] > 0 else 0
-        } for row in cursor.fetchall()}
-
-        return {
-            "total_reviews": overall['total_reviews'] or 0,
-            "correct_reviews": overall['correct_reviews'] or 0,
-            "accuracy": (overall['correct_reviews'] / overall['total_reviews'] * 100)
-                        if overall['total_reviews'] else 0,
-            "avg_time_seconds": overall['avg_time'] or 0,
-            "total_cards": total_cards,
-            "mastered": mastered,
-            "learning": learning,
-            "new_cards": new_cards,
-            "due_today": due_today,
-            "by_subject": by_subject
-        }
-
-
-def get_user_flashcard_sessions(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-    """Get recent flashcard sessions for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM flashcard_sessions
-            WHERE user_id = ?
-            ORDER BY started_at DESC
-            LIMIT ?
-        """, (user_id, limit))
-        sessions = []
-        for row in cursor.fetchall():
-            s = dict(row)
-            s['subjects'] = json.loads(s['subjects']) if s['subjects'] else []
-            sessions.append(s)
-        return sessions
-
-
-# ============== STUDY STREAK OPERATIONS ==============
-
-def update_study_streak(user_id: int):
-    """Update the study streak for a user after they answer a question."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
-
-        # Get current streak info
-        cursor.execute("""
-            SELECT current_streak, longest_streak, last_study_date
-            FROM study_streaks WHERE user_id = ?
-        """, (user_id,))
-        row = cursor.fetchone()
-
-        if not row:
-            # First time studying
-            cursor.execute("""
-                INSERT INTO study_streaks (user_id, current_streak, longest_streak, last_study_date)
-                VALUES (?, 1, 1, ?)
-            """, (user_id, today))
-        else:
-            last_date = row['last_study_date']
-            current = row['current_streak']
-            longest = row['longest_streak']
-
-            if last_date == today:
-                # Already studied today, no change
-                pass
-            elif last_date == (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'):
-                # Studied yesterday, increment streak
-                current += 1
-                longest = max(longest, current)
-                cursor.execute("""
-                    UPDATE study_streaks
-                    SET current_streak = ?, longest_streak = ?, last_study_date = ?
-                    WHERE user_id = ?
-                """, (current, longest, today, user_id))
-            else:
-                # Streak broken, start over
-                cursor.execute("""
-                    UPDATE study_streaks
-                    SET current_streak = 1, last_study_date = ?
-                    WHERE user_id = ?
-                """, (today, user_id))
-
-
-def get_study_streak(user_id: int) -> Dict[str, Any]:
-    """Get the current study streak for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT current_streak, longest_streak, last_study_date
-            FROM study_streaks WHERE user_id = ?
-        """, (user_id,))
-        row = cursor.fetchone()
-
-        if not row:
-            return {"current_streak": 0, "longest_streak": 0, "last_study_date": None}
-
-        # Check if streak is still valid
-        today = datetime.now().strftime('%Y-%m-%d')
-        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-
-        if row['last_study_date'] not in [today, yesterday]:
-            # Streak is broken
-            return {"current_streak": 0, "longest_streak": row['longest_streak'], "last_study_date": row['last_study_date']}
-
-        return dict(row)
-
-
-# ============== DAILY GOAL OPERATIONS ==============
-
-def get_daily_goal(user_id: int) -> int:
-    """Get the daily question goal for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT daily_question_goal FROM daily_goals WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
-        return row['daily_question_goal'] if row else 30
-
-
-def set_daily_goal(user_id: int, goal: int):
-    """Set the daily question goal for a user."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO daily_goals (user_id, daily_question_goal)
-            VALUES (?, ?)
-            ON CONFLICT(user_id) DO UPDATE SET daily_question_goal = ?
-        """, (user_id, goal, goal))
-
-
-def get_daily_progress(user_id: int) -> Dict[str, Any]:
-    """Get today's progress toward the daily goal."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
-
-        cursor.execute("""
-            SELECT COUNT(*) as answered, SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct
-            FROM attempts
-            WHERE user_id = ? AND DATE(answered_at) = ?
-        """, (user_id, today))
-        row = cursor.fetchone()
-
-        goal = get_daily_goal(user_id)
-        answered = row['answered'] or 0
-        correct = row['correct'] or 0
-
-        return {
-            "goal": goal,
-            "answered": answered,
-            "correct": correct,
-            "progress_percent": min(100, (answered / goal * 100)) if goal > 0 else 0,
-            "goal_met": answered >= goal
-        }
-
-
-# ============== QUESTION REVIEW SCHEDULING ==============
-
-def schedule_question_review(user_id: int, question_id: str, days_from_now: int, review_type: str):
-    """Schedule a question for review after X days."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        scheduled_date = (datetime.now() + timedelta(days=days_from_now)).strftime('%Y-%m-%d')
-
-        # Check if already scheduled
-        cursor.execute("""
-            SELECT id FROM question_reviews
-            WHERE user_id = ? AND question_id = ? AND review_type = ? AND completed = FALSE
-        """, (user_id, question_id, review_type))
-
-        if not cursor.fetchone():
-            cursor.execute("""
-                INSERT INTO question_reviews (user_id, question_id, scheduled_date, review_type)
-                VALUES (?, ?, ?, ?)
-            """, (user_id, question_id, scheduled_date, review_type))
-
-
-def get_due_question_reviews(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-    """Get questions due for review today or earlier."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
-
-        cursor.execute("""
-            SELECT qr.*, q.subject, q.chapter, q.chapter_title, q.question_text
-            FROM question_reviews qr
-            JOIN questions q ON qr.question_id = q.id
-            WHERE qr.user_id = ? AND qr.scheduled_date <= ? AND qr.completed = FALSE
-            ORDER BY qr.scheduled_date ASC
-            LIMIT ?
-        """, (user_id, today, limit))
-
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def complete_question_review(user_id: int, question_id: str, review_type: str):
-    """Mark a scheduled review as completed."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE question_reviews
-            SET completed = TRUE, completed_at = CURRENT_TIMESTAMP
-            WHERE user_id = ? AND question_id = ? AND review_type = ? AND completed = FALSE
-        """, (user_id, question_id, review_type))
-
-
-# ============== ERROR NOTEBOOK & LEECH DETECTION ==============
-
-def update_error_type(attempt_id: int, error_type: str):
-    """Update the error type for an attempt."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE attempts SET error_type = ? WHERE id = ?
-        """, (error_type, attempt_id))
-
-
-def get_missed_questions(user_id: int, subject: str = None, error_type: str = None,
-                          limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
-    """Get all missed questions for the error notebook."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        query = """
-            SELECT a.id as attempt_id, a.question_id, a.selected_answer, a.error_type,
-                   a.time_taken_seconds, a.answered_at, a.session_id,
-                   q.subject, q.chapter, q.chapter_title, q.question_text,
-                   q.correct_answer, q.explanation, q.short_reason
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ? AND a.correct = FALSE
-        """
-        params = [user_id]
-
-        if subject:
-            query += " AND q.subject = ?"
-            params.append(subject)
-
-        if error_type:
-            query += " AND a.error_type = ?"
-            params.append(error_type)
-
-        query += " ORDER BY a.answered_at DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-
-        cursor.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
-
-
-def get_error_type_stats(user_id: int) -> Dict[str, int]:
-    """Get counts of each error type."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT error_type, COUNT(*) as count
-            FROM attempts
-            WHERE user_id = ? AND correct = FALSE AND error_type IS NOT NULL
-            GROUP BY error_type
-        """, (user_id,))
-
-        return {row['error_type']: row['count'] for row in cursor.fetchall()}
-
-
-def get_leech_questions(user_id: int, min_wrong_count: int = 3) -> List[Dict[str, Any]]:
-    """Get questions that have been missed 3+ times (leeches)."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT q.*, COUNT(*) as wrong_count,
-                   MAX(a.answered_at) as last_wrong
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ? AND a.correct = FALSE
-            GROUP BY a.question_id
-            HAVING COUNT(*) >= ?
-            ORDER BY wrong_count DESC
-        """, (user_id, min_wrong_count))
-
-        results = []
-        for row in cursor.fetchall():
-            q = dict(row)
-            q['options'] = json.loads(q['options'])
-            if q.get('wrong_answer_explanations'):
-                try:
-                    q['wrong_answer_explanations'] = json.loads(q['wrong_answer_explanations'])
-                except:
-                    q['wrong_answer_explanations'] = {}
-            results.append(q)
-        return results
-
-
-# ============== ENHANCED STATS ==============
-
-def get_time_accuracy_stats(user_id: int) -> Dict[str, Any]:
-    """Get time vs accuracy statistics."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Average time by correctness
-        cursor.execute("""
-            SELECT correct, AVG(time_taken_seconds) as avg_time, COUNT(*) as count
-            FROM attempts
-            WHERE user_id = ? AND time_taken_seconds IS NOT NULL
-            GROUP BY correct
-        """, (user_id,))
-
-        by_correct = {bool(row['correct']): {'avg_time': row['avg_time'], 'count': row['count']}
-                      for row in cursor.fetchall()}
-
-        # Time by subject
-        cursor.execute("""
-            SELECT q.subject, AVG(a.time_taken_seconds) as avg_time,
-                   SUM(CASE WHEN a.correct THEN 1 ELSE 0 END) as correct,
-                   COUNT(*) as total
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ? AND a.time_taken_seconds IS NOT NULL
-            GROUP BY q.subject
-        """, (user_id,))
-
-        by_subject = {row['subject']: {
-            'avg_time': row['avg_time'],
-            'accuracy': row['correct'] / row['total'] if row['total'] > 0 else 0,
-            'total': row['total']
-        } for row in cursor.fetchall()}
-
-        # Slow + Wrong questions (took > 60 seconds and got wrong)
-        cursor.execute("""
-            SELECT a.question_id, q.subject, q.chapter, q.chapter_title,
-                   q.question_text, a.time_taken_seconds
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ? AND a.correct = FALSE AND a.time_taken_seconds > 60
-            ORDER BY a.time_taken_seconds DESC
-            LIMIT 10
-        """, (user_id,))
-
-        slow_wrong = [dict(row) for row in cursor.fetchall()]
-
-        return {
-            "by_correctness": by_correct,
-            "by_subject": by_subject,
-            "slow_and_wrong": slow_wrong
-        }
-
-
-def get_score_trend(user_id: int, days: int = 30) -> Dict[str, Any]:
-    """Get score trends over time."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-
-        # Daily accuracy over time
-        cursor.execute("""
-            SELECT DATE(answered_at) as date,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN correct THEN 1 ELSE 0 END) as correct
-            FROM attempts
-            WHERE user_id = ? AND answered_at >= DATE('now', ?)
-            GROUP BY DATE(answered_at)
-            ORDER BY date
-        """, (user_id, f'-{days} days'))
-
-        daily_stats = []
-        for row in cursor.fetchall():
-            daily_stats.append({
-                'date': row['date'],
-                'total': row['total'],
-                'correct': row['correct'],
-                'accuracy': (row['correct'] / row['total'] * 100) if row['total'] > 0 else 0
-            })
-
-        # Calculate trend (improvement over time)
-        if len(daily_stats) >= 2:
-            first_half = daily_stats[:len(daily_stats)//2]
-            second_half = daily_stats[len(daily_stats)//2:]
-
-            first_accuracy = sum(d['correct'] for d in first_half) / max(1, sum(d['total'] for d in first_half)) * 100
-            second_accuracy = sum(d['correct'] for d in second_half) / max(1, sum(d['total'] for d in second_half)) * 100
-
-            trend = second_accuracy - first_accuracy
-            trend_direction = 'improving' if trend > 2 else ('declining' if trend < -2 else 'stable')
-        else:
-            trend = 0
-            trend_direction = 'insufficient_data'
-
-        return {
-            "daily_stats": daily_stats,
-            "trend_percent": round(trend, 1),
-            "trend_direction": trend_direction
-        }
-
-
-def get_smart_recommendation(user_id: int) -> Dict[str, Any]:
-    """Generate a smart 'what to do next' recommendation."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        today = datetime.now().strftime('%Y-%m-%d')
-
-        recommendations = []
-
-        # Check daily progress
-        daily = get_daily_progress(user_id)
-        remaining = daily['goal'] - daily['answered']
-        if remaining > 0:
-            recommendations.append({
-                "type": "daily_goal",
-                "priority": 1,
-                "message": f"Complete {remaining} more questions to hit your daily goal",
-                "action": "practice"
-            })
-
-        # Check for due reviews
-        due_reviews = get_due_question_reviews(user_id, limit=100)
-        if due_reviews:
-            recommendations.append({
-                "type": "review_due",
-                "priority": 2,
-                "message": f"You have {len(due_reviews)} questions scheduled for review today",
-                "action": "review",
-                "count": len(due_reviews)
-            })
-
-        # Check for leeches
-        leeches = get_leech_questions(user_id)
-        if leeches:
-            recommendations.append({
-                "type": "leeches",
-                "priority": 3,
-                "message": f"You have {len(leeches)} difficult questions that need extra attention",
-                "action": "leech_review",
-                "count": len(leeches)
-            })
-
-        # Find weakest subject
-        cursor.execute("""
-            SELECT q.subject,
-                   SUM(CASE WHEN a.correct THEN 1 ELSE 0 END) as correct,
-                   COUNT(*) as total
-            FROM attempts a
-            JOIN questions q ON a.question_id = q.id
-            WHERE a.user_id = ?
-            GROUP BY q.subject
-            HAVING total >= 5
-            ORDER BY (1.0 * correct / total) ASC
-            LIMIT 1
-        """, (user_id,))
-        weakest = cursor.fetchone()
-
-        if weakest:
-            accuracy = (weakest['correct'] / weakest['total']) * 100
-            if accuracy < 70:
-                recommendations.append({
-                    "type": "weak_subject",
-                    "priority": 4,
-                    "message": f"Focus on {weakest['subject']} ({accuracy:.0f}% accuracy)",
-                    "action": "practice_subject",
-                    "subject": weakest['subject']
-                })
-
-        # Sort by priority
-        recommendations.sort(key=lambda x: x['priority'])
-
-        return {
-            "recommendations": recommendations,
-            "top_recommendation": recommendations[0] if recommendations else None
-        }
-
-
-if __name__ == "__main__":
-    print("Initializing database...")
-    init_db()
-    print("Loading questions from JSON files...")
-    load_questions_from_json()
-    print("Loading flashcards from JSON files...")
-    load_flashcards_from_json()
-    print("Database setup complete!")
+"""
+Database module for MCAT Trainer
+Uses SQLite for persistence
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+from contextlib import contextmanager
+from functools import lru_cache
+
+# Prefer pysqlite3 when installed: it bundles a current SQLite build, which
+# is typically newer (and faster) than the one linked into the interpreter.
+# The module is API-compatible, so everything below is oblivious to which
+# one it got.
+try:
+    import pysqlite3 as sqlite3
+except ImportError:
+    import sqlite3
+
+# Optional C-backed JSON libraries; the stdlib paths below are the fallback.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Database path - use environment variable or default
+DB_PATH = os.environ.get("DATABASE_PATH", "mcat_trainer.db")
+
+
+def _is_uri_path() -> bool:
+    """True when DATABASE_PATH is a sqlite URI rather than a plain path."""
+    return DB_PATH.startswith("file:")
+
+
+def _is_memory_db() -> bool:
+    return DB_PATH == ":memory:" or (_is_uri_path() and "mode=memory" in DB_PATH)
+
+
+def get_db_path():
+    """Get the database path, creating directory if needed.
+
+    DATABASE_PATH may also be a sqlite URI, e.g.
+    file::memory:?cache=shared for an fsync-free ephemeral database in
+    tests or CI; URIs pass through untouched.
+    """
+    if _is_uri_path():
+        return DB_PATH
+    db_path = Path(DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    return str(db_path)
+
+
+def _apply_pragmas(conn):
+    """Apply per-connection performance PRAGMAs (skipped for in-memory databases)."""
+    if _is_memory_db():
+        return
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA busy_timeout=5000")
+
+
+# Connections are cached per thread so SQLite's page cache stays warm across
+# calls instead of being thrown away on every open/close cycle.
+_local = threading.local()
+_open_connections = []
+_open_connections_lock = threading.Lock()
+
+
+def _connect():
+    """Open and configure a new connection."""
+    # A larger statement cache keeps the hot queries compiled across calls;
+    # cache hits require byte-identical SQL, so hot statements live in
+    # module-level constants below.
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False,
+                           cached_statements=512, uri=_is_uri_path())
+    conn.row_factory = sqlite3.Row
+    _apply_pragmas(conn)
+    return conn
+
+
+@contextmanager
+def get_connection():
+    """Context manager yielding this thread's cached database connection.
+
+    The connection is opened lazily on first use per thread and kept open for
+    the life of the process; the context manager only commits (or rolls back)
+    the enclosed work.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+        with _open_connections_lock:
+            _open_connections.append(conn)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+@contextmanager
+def get_read_connection():
+    """Context manager yielding this thread's read-only connection.
+
+    Read-only connections (URI mode=ro plus PRAGMA query_only) never take the
+    writer lock, so under WAL the stats endpoints keep serving while attempts
+    are being recorded. Falls back to the regular connection for in-memory
+    databases or before the database file exists.
+    """
+    conn = getattr(_local, "ro_conn", None)
+    if conn is None:
+        if _is_memory_db() or _is_uri_path() or not Path(DB_PATH).exists():
+            with get_connection() as rw_conn:
+                yield rw_conn
+            return
+        # isolation_level=None: plain autocommit, so reads never carry
+        # BEGIN/COMMIT bookkeeping (query_only already forbids writes)
+        conn = sqlite3.connect(f"file:{get_db_path()}?mode=ro", uri=True,
+                               check_same_thread=False, cached_statements=512,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA cache_size=-64000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _local.ro_conn = conn
+        with _open_connections_lock:
+            _open_connections.append(conn)
+    yield conn
+
+
+def close_connections():
+    """Close all cached connections (registered to run at process exit).
+
+    PRAGMA optimize before closing lets SQLite refresh whatever statistics
+    the session's query mix showed to be stale; it is cheap for long-lived
+    connections and a no-op on the read-only ones.
+    """
+    with _open_connections_lock:
+        for conn in _open_connections:
+            try:
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _open_connections.clear()
+
+
+atexit.register(close_connections)
+
+
+# Full schema DDL, applied as a single executescript so schema setup is one
+# round-trip through the SQLite VM instead of a dozen execute calls.  Every
+# statement is idempotent (IF NOT EXISTS / OR IGNORE), so running it against
+# an existing database is a no-op.
+_SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    -- WITHOUT ROWID: the TEXT id is the btree key itself, so primary-key
+    -- lookups skip the rowid indirection and the table needs no hidden
+    -- id index.
+    CREATE TABLE IF NOT EXISTS questions (
+        id TEXT PRIMARY KEY,
+        subject TEXT NOT NULL,
+        chapter INTEGER NOT NULL,
+        chapter_title TEXT NOT NULL,
+        question_number INTEGER NOT NULL,
+        question_text TEXT NOT NULL,
+        options TEXT NOT NULL,
+        correct_answer TEXT NOT NULL,
+        explanation TEXT NOT NULL,
+        short_reason TEXT,
+        wrong_answer_explanations TEXT,
+        image_filename TEXT,
+        learn_with_ai TEXT
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ended_at TIMESTAMP,
+        total_questions INTEGER DEFAULT 0,
+        correct_count INTEGER DEFAULT 0,
+        subjects TEXT,
+        mode TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        question_id TEXT NOT NULL,
+        session_id INTEGER,
+        correct BOOLEAN NOT NULL,
+        selected_answer TEXT,
+        time_taken_seconds REAL,
+        timed_out BOOLEAN DEFAULT FALSE,
+        answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        error_type TEXT,
+        -- Denormalized from questions at insert time so the stats queries
+        -- aggregate attempts without probing the questions btree per row
+        subject TEXT,
+        chapter INTEGER,
+        chapter_title TEXT,
+        -- VIRTUAL rather than STORED so ALTER TABLE can add it to older
+        -- databases; idx_attempts_user_date materializes the value anyway
+        answered_date TEXT GENERATED ALWAYS AS (DATE(answered_at)) VIRTUAL,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (question_id) REFERENCES questions(id),
+        FOREIGN KEY (session_id) REFERENCES sessions(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts(user_id);
+    CREATE INDEX IF NOT EXISTS idx_attempts_question ON attempts(question_id);
+    CREATE INDEX IF NOT EXISTS idx_attempts_session ON attempts(session_id);
+    CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions(subject);
+
+    -- Composite indexes matching the hot query shapes: user_id filter plus
+    -- ORDER BY ... DESC LIMIT becomes an index range scan with early
+    -- termination instead of a sort over all matching rows.
+    CREATE INDEX IF NOT EXISTS idx_sessions_user_started ON sessions(user_id, started_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_attempts_user_answered ON attempts(user_id, answered_at DESC, question_id, correct, time_taken_seconds);
+    CREATE INDEX IF NOT EXISTS idx_attempts_session_qid ON attempts(session_id, question_id);
+    CREATE INDEX IF NOT EXISTS idx_questions_subject_chapter ON questions(subject, chapter);
+
+    -- Wrong-answer paths (error notebook, leeches, error-type stats) all
+    -- filter user_id + correct=FALSE; the first index serves the
+    -- answered_at DESC listings, the second the per-question GROUP BYs
+    CREATE INDEX IF NOT EXISTS idx_attempts_user_correct_time ON attempts(user_id, correct, answered_at DESC);
+    CREATE INDEX IF NOT EXISTS idx_attempts_user_correct_qid ON attempts(user_id, correct, question_id);
+
+    CREATE TABLE IF NOT EXISTS flashcards (
+        id TEXT PRIMARY KEY,
+        subject TEXT NOT NULL,
+        chapter INTEGER NOT NULL,
+        chapter_title TEXT NOT NULL,
+        term TEXT NOT NULL,
+        definition TEXT NOT NULL,
+        mnemonic TEXT,
+        category TEXT
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS flashcard_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ended_at TIMESTAMP,
+        total_cards INTEGER DEFAULT 0,
+        correct_count INTEGER DEFAULT 0,
+        subjects TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+
+    -- Flashcard reviews (spaced repetition tracking)
+    CREATE TABLE IF NOT EXISTS flashcard_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        flashcard_id TEXT NOT NULL,
+        session_id INTEGER,
+        correct BOOLEAN NOT NULL,
+        time_taken_seconds REAL,
+        reviewed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        ease_factor REAL DEFAULT 2.5,
+        interval_days INTEGER DEFAULT 1,
+        next_review_date DATE,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (flashcard_id) REFERENCES flashcards(id),
+        FOREIGN KEY (session_id) REFERENCES flashcard_sessions(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_flashcards_subject ON flashcards(subject);
+    CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_user ON flashcard_reviews(user_id);
+    CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_flashcard ON flashcard_reviews(flashcard_id);
+    CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_next ON flashcard_reviews(user_id, next_review_date);
+    CREATE INDEX IF NOT EXISTS idx_flashcard_reviews_user_card_time ON flashcard_reviews(user_id, flashcard_id, reviewed_at DESC);
+
+    -- Current SM-2 state per (user, card), upserted on every review so the
+    -- hot path reads one primary-key row instead of the newest history row
+    CREATE TABLE IF NOT EXISTS flashcard_state (
+        user_id INTEGER NOT NULL,
+        flashcard_id TEXT NOT NULL,
+        ease_factor REAL NOT NULL DEFAULT 2.5,
+        interval_days INTEGER NOT NULL DEFAULT 1,
+        next_review_date DATE,
+        PRIMARY KEY (user_id, flashcard_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_flashcard_state_due ON flashcard_state(user_id, next_review_date, flashcard_id);
+
+    CREATE TABLE IF NOT EXISTS study_streaks (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE,
+        current_streak INTEGER DEFAULT 0,
+        longest_streak INTEGER DEFAULT 0,
+        last_study_date DATE,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS daily_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL UNIQUE,
+        daily_question_goal INTEGER DEFAULT 30,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    );
+
+    -- Question review schedule (spaced repetition of missed questions)
+    CREATE TABLE IF NOT EXISTS question_reviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        question_id TEXT NOT NULL,
+        scheduled_date DATE NOT NULL,
+        review_type TEXT NOT NULL,
+        completed BOOLEAN DEFAULT FALSE,
+        completed_at TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (question_id) REFERENCES questions(id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_question_reviews_user_date ON question_reviews(user_id, scheduled_date);
+    CREATE INDEX IF NOT EXISTS idx_question_reviews_question ON question_reviews(question_id);
+    CREATE INDEX IF NOT EXISTS idx_question_reviews_user_due ON question_reviews(user_id, completed, scheduled_date);
+
+    -- Per-topic accuracy summary, incremented on every attempt so the
+    -- dashboard reads O(topics) rows instead of aggregating all attempts
+    CREATE TABLE IF NOT EXISTS topic_stats (
+        user_id INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        chapter INTEGER NOT NULL,
+        chapter_title TEXT NOT NULL,
+        correct INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        last_at TIMESTAMP,
+        PRIMARY KEY (user_id, subject, chapter)
+    ) WITHOUT ROWID;
+
+    -- Default users
+    INSERT OR IGNORE INTO users (name) VALUES ('Brandon');
+    INSERT OR IGNORE INTO users (name) VALUES ('Porter');
+"""
+
+
+def init_db():
+    """Initialize the database schema."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # WAL is persistent, so setting it once here covers all future connections.
+        # Readers (stats endpoints) no longer block behind a writer, and commits
+        # become a WAL append instead of a rollback-journal fsync.
+        if not _is_memory_db():
+            journal_mode = cursor.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            print(f"SQLite journal_mode={journal_mode}")
+
+        conn.executescript(_SCHEMA_SQL)
+
+        # Migration: widen idx_attempts_user_answered where an older database
+        # still has the narrow (user_id, answered_at, question_id) version
+        cursor.execute("""
+            SELECT sql FROM sqlite_master
+            WHERE type = 'index' AND name = 'idx_attempts_user_answered'
+        """)
+        idx_row = cursor.fetchone()
+        if idx_row and 'time_taken_seconds' not in idx_row[0]:
+            cursor.execute("DROP INDEX idx_attempts_user_answered")
+            cursor.execute("""
+                CREATE INDEX idx_attempts_user_answered
+                ON attempts(user_id, answered_at DESC, question_id, correct, time_taken_seconds)
+            """)
+
+        # Migration: rebuild questions as WITHOUT ROWID on databases created
+        # before the table gained that clause (a one-shot copy; the loaders
+        # repopulate nothing, the data moves as-is)
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'questions'")
+        questions_sql = cursor.fetchone()[0]
+        if 'WITHOUT ROWID' not in questions_sql:
+            # Build the replacement first, then drop and rename: renaming the
+            # old table instead would rewrite the foreign keys in attempts and
+            # question_reviews to point at the temporary name.
+            cursor.execute(questions_sql.replace('questions', 'questions_new', 1) + " WITHOUT ROWID")
+            cursor.execute("INSERT INTO questions_new SELECT * FROM questions")
+            cursor.execute("DROP TABLE questions")
+            cursor.execute("ALTER TABLE questions_new RENAME TO questions")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_subject ON questions(subject)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_subject_chapter ON questions(subject, chapter)")
+
+        # Migration: same WITHOUT ROWID rebuild for flashcards
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'flashcards'")
+        flashcards_sql = cursor.fetchone()[0]
+        if 'WITHOUT ROWID' not in flashcards_sql:
+            cursor.execute(flashcards_sql.replace('flashcards', 'flashcards_new', 1) + " WITHOUT ROWID")
+            cursor.execute("INSERT INTO flashcards_new SELECT * FROM flashcards")
+            cursor.execute("DROP TABLE flashcards")
+            cursor.execute("ALTER TABLE flashcards_new RENAME TO flashcards")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_flashcards_subject ON flashcards(subject)")
+
+        # Migration: Add learn_with_ai column if it doesn't exist
+        cursor.execute("PRAGMA table_info(questions)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'learn_with_ai' not in columns:
+            cursor.execute("ALTER TABLE questions ADD COLUMN learn_with_ai TEXT")
+
+        # Migration: Add error_type column to attempts if it doesn't exist
+        # (table_xinfo, not table_info: only the former lists generated
+        # columns such as answered_date below)
+        cursor.execute("PRAGMA table_xinfo(attempts)")
+        attempt_columns = [col[1] for col in cursor.fetchall()]
+        if 'error_type' not in attempt_columns:
+            cursor.execute("ALTER TABLE attempts ADD COLUMN error_type TEXT")
+
+        # Migration: denormalize subject/chapter onto attempts and backfill
+        # from questions (one-shot; record_attempt fills them going forward)
+        if 'subject' not in attempt_columns:
+            cursor.execute("ALTER TABLE attempts ADD COLUMN subject TEXT")
+            cursor.execute("ALTER TABLE attempts ADD COLUMN chapter INTEGER")
+            cursor.execute("ALTER TABLE attempts ADD COLUMN chapter_title TEXT")
+            cursor.execute("""
+                UPDATE attempts SET
+                    subject = (SELECT subject FROM questions WHERE id = attempts.question_id),
+                    chapter = (SELECT chapter FROM questions WHERE id = attempts.question_id),
+                    chapter_title = (SELECT chapter_title FROM questions WHERE id = attempts.question_id)
+            """)
+
+        # Migration: day-of-attempt as a generated column, so the trend and
+        # daily-progress queries group/filter without re-evaluating DATE()
+        # per row
+        if 'answered_date' not in attempt_columns:
+            cursor.execute("""
+                ALTER TABLE attempts ADD COLUMN answered_date TEXT
+                GENERATED ALWAYS AS (DATE(answered_at)) VIRTUAL
+            """)
+
+        # Migration: dedupe question_reviews, then enforce uniqueness so
+        # repeat wrong answers can never accumulate identical review rows.
+        # Kept out of _SCHEMA_SQL because it must not run before the dedupe.
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master
+            WHERE type = 'index' AND name = 'idx_question_reviews_unique'
+        """)
+        if not cursor.fetchone():
+            cursor.execute("""
+                DELETE FROM question_reviews WHERE id NOT IN (
+                    SELECT MIN(id) FROM question_reviews
+                    GROUP BY user_id, question_id, scheduled_date, review_type
+                )
+            """)
+            cursor.execute("""
+                CREATE UNIQUE INDEX idx_question_reviews_unique
+                ON question_reviews(user_id, question_id, scheduled_date, review_type)
+            """)
+
+        # Created here rather than in _SCHEMA_SQL: on older databases the
+        # columns they index only exist after the migrations above run
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attempts_user_subject
+            ON attempts(user_id, subject, correct)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_attempts_user_date
+            ON attempts(user_id, answered_date)
+        """)
+
+        # Backfill topic_stats from historical attempts on existing databases
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM topic_stats)")
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                INSERT INTO topic_stats (user_id, subject, chapter, chapter_title,
+                                         correct, total, last_at)
+                SELECT a.user_id, q.subject, q.chapter, q.chapter_title,
+                       SUM(a.correct), COUNT(*),
+                       MAX(a.answered_at)
+                FROM attempts a
+                JOIN questions q ON a.question_id = q.id
+                GROUP BY a.user_id, q.subject, q.chapter
+            """)
+
+        # Backfill flashcard_state with each (user, card)'s newest review on
+        # existing databases
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM flashcard_state)")
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                INSERT INTO flashcard_state (user_id, flashcard_id, ease_factor,
+                                             interval_days, next_review_date)
+                SELECT fr.user_id, fr.flashcard_id, fr.ease_factor,
+                       fr.interval_days, fr.next_review_date
+                FROM flashcard_reviews fr
+                WHERE fr.rowid = (
+                    SELECT rowid FROM flashcard_reviews
+                    WHERE user_id = fr.user_id AND flashcard_id = fr.flashcard_id
+                    ORDER BY reviewed_at DESC
+                    LIMIT 1
+                )
+            """)
+
+        # Refresh planner statistics so the covering indexes above actually
+        # get picked; analysis_limit bounds the row sampling to keep startup
+        # cheap on large attempt histories
+        cursor.execute("PRAGMA analysis_limit=1000")
+        cursor.execute("ANALYZE")
+
+
+def _json_dumps(obj) -> str:
+    """Serialize to JSON text, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(',', ':'))
+
+
+# Shared decode entry point so every payload path picks up orjson when it
+# is installed; resolved once at import instead of per call.
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+
+def load_questions_from_json():
+    """Load questions from JSON files into the database."""
+    data_dir = Path(__file__).parent / "data"
+
+    subject_files = {
+        "Biology": "mcat_biology_questions.json",
+        "Biochemistry": "mcat_biochemistry_questions.json",
+        "Behavioral Sciences": "mcat_behavioral_sciences_questions.json",
+        "General Chemistry": "mcat_general_chemistry_questions.json",
+        "Organic Chemistry": "mcat_organic_chemistry_questions.json",
+        "Physics and Math": "mcat_physics_math_questions.json",
+    }
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Connections never turn PRAGMA foreign_keys on, but state that
+        # explicitly here so the ingest path stays free of FK bookkeeping
+        # even if enforcement is ever enabled for the mutation endpoints
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("PRAGMA defer_foreign_keys=ON")
+
+        # fsync off for the duration of the load: a crash mid-reload only
+        # loses the reload itself, which is rerunnable. The explicit commit
+        # below happens before the PRAGMA is restored so the whole load
+        # pays no sync. journal_mode stays WAL — flipping it mid-connection
+        # is not safe.
+        cursor.execute("PRAGMA synchronous=OFF")
+        try:
+            _load_question_files(cursor, data_dir, subject_files)
+            conn.commit()
+        finally:
+            cursor.execute("PRAGMA synchronous=NORMAL")
+
+    get_subjects.cache_clear()
+    _question_cache.clear()
+    _questions_by_subject.clear()
+
+
+def _load_question_files(cursor, data_dir, subject_files):
+    """Ingest each subject file inside one IMMEDIATE transaction."""
+    # Take the write lock once up front; every file then lands in one
+    # transaction instead of SQLite upgrading the lock per statement.
+    cursor.execute("BEGIN IMMEDIATE")
+
+    # Secondary indexes are cheaper to rebuild once after the load than
+    # to maintain row by row (the primary key stays for OR REPLACE)
+    cursor.execute("DROP INDEX IF EXISTS idx_questions_subject")
+    cursor.execute("DROP INDEX IF EXISTS idx_questions_subject_chapter")
+
+    for subject, filename in subject_files.items():
+        filepath = data_dir / filename
+        if not filepath.exists():
+            print(f"Warning: {filename} not found")
+            continue
+
+        # Hand the raw file text to SQLite and unpack it with json_each:
+        # the whole file is parsed and inserted in one statement, with no
+        # Python-side per-row loop or re-serialization of the JSON blobs.
+        id_prefix = subject.lower().replace(' ', '_') + '_'
+        blob = filepath.read_text(encoding='utf-8')
+        cursor.execute("""
+            INSERT OR REPLACE INTO questions
+            (id, subject, chapter, chapter_title, question_number,
+             question_text, options, correct_answer, explanation,
+             short_reason, wrong_answer_explanations, image_filename, learn_with_ai)
+            SELECT ? || json_extract(value, '$.id'),
+                   ?,
+                   json_extract(value, '$.chapter'),
+                   json_extract(value, '$.chapter_title'),
+                   json_extract(value, '$.question_number'),
+                   json_extract(value, '$.question_text'),
+                   json_extract(value, '$.options'),
+                   json_extract(value, '$.correct_answer'),
+                   json_extract(value, '$.explanation'),
+                   COALESCE(json_extract(value, '$.short_reason'), ''),
+                   COALESCE(json_extract(value, '$.wrong_answer_explanations'), '{}'),
+                   COALESCE(json_extract(value, '$.image_filename'), ''),
+                   COALESCE(json_extract(value, '$.learn_with_ai'), '{}')
+            FROM json_each(?, '$.questions')
+        """, (id_prefix, subject, blob))
+
+    cursor.execute("CREATE INDEX idx_questions_subject ON questions(subject)")
+    cursor.execute("CREATE INDEX idx_questions_subject_chapter ON questions(subject, chapter)")
+    cursor.execute("ANALYZE questions")
+
+    cursor.execute("SELECT COUNT(*) FROM questions")
+    count = cursor.fetchone()[0]
+    print(f"Loaded {count} questions into database")
+
+
+def _dict_row(cursor, row):
+    """Cursor row factory producing plain dicts.
+
+    Saves the sqlite3.Row detour plus a dict(row) copy per row in helpers
+    that return lists of dicts anyway.
+    """
+    return {d[0]: row[i] for i, d in enumerate(cursor.description)}
+
+
+# User operations
+def get_all_users() -> List[Dict[str, Any]]:
+    """Get all users."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        cursor.execute("SELECT id, name, created_at FROM users ORDER BY name")
+        return cursor.fetchall()
+
+
+def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user by ID."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, created_at FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+# INSERT ... RETURNING (SQLite >= 3.35) hands back the created row in the same
+# statement, skipping the lastrowid + follow-up SELECT round-trip.
+_SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35)
+
+
+def create_user(name: str) -> Dict[str, Any]:
+    """Create a new user."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if _SUPPORTS_RETURNING:
+            cursor.execute(
+                "INSERT INTO users (name) VALUES (?) RETURNING id, name, created_at",
+                (name,))
+            return dict(cursor.fetchone())
+        cursor.execute("INSERT INTO users (name) VALUES (?)", (name,))
+        return {"id": cursor.lastrowid, "name": name}
+
+
+# Question operations
+_QUESTION_COLUMNS = (
+    "id, subject, chapter, chapter_title, question_number, question_text, "
+    "options, correct_answer, explanation, short_reason, "
+    "wrong_answer_explanations, image_filename, learn_with_ai"
+)
+
+_GET_QUESTION_SQL = f"SELECT {_QUESTION_COLUMNS} FROM questions WHERE id = ?"
+
+_GET_QUESTION_SUMMARY_SQL = (
+    "SELECT id, subject, chapter, chapter_title, question_number "
+    "FROM questions WHERE id = ?"
+)
+
+# Question rows carry the same JSON blobs on every read; memoizing the decode
+# keyed by the raw TEXT turns repeat parses into dict lookups, and orjson
+# (when installed) makes the cache misses several times cheaper too.
+_cached_json_loads = lru_cache(maxsize=4096)(_json_loads)
+
+
+def _decode_subjects(raw: Optional[str]) -> List[str]:
+    """Decode a session's subjects column.
+
+    Users run the same subject mixes session after session, so the memoized
+    parse makes listing 20 sessions cost one decode, not 20.
+    """
+    return _cached_json_loads(raw) if raw else []
+
+
+def _decode_question_row(row) -> Dict[str, Any]:
+    """Convert a questions row into a dict with its JSON columns decoded."""
+    q = dict(row)
+    q['options'] = _cached_json_loads(q['options'])
+    for field in ('wrong_answer_explanations', 'learn_with_ai'):
+        if q.get(field):
+            try:
+                q[field] = _cached_json_loads(q[field])
+            except (ValueError, TypeError):
+                q[field] = {}
+        else:
+            q[field] = {}
+    return q
+
+
+# Questions come from static JSON and only change when the loader runs, so
+# the first full read caches every decoded row; later lookups skip SQLite
+# and the JSON decode entirely. The loader clears both dicts.
+_question_cache: Dict[str, Dict[str, Any]] = {}
+_questions_by_subject: Dict[str, List[Dict[str, Any]]] = {}
+
+
+def _ensure_question_cache():
+    if _question_cache:
+        return
+    for q in iter_all_questions():
+        _question_cache[q['id']] = q
+        _questions_by_subject.setdefault(q['subject'], []).append(q)
+
+
+def get_question_by_id(question_id: str) -> Optional[Dict[str, Any]]:
+    """Get a question by ID."""
+    _ensure_question_cache()
+    q = _question_cache.get(question_id)
+    # Shallow copy so callers can attach derived keys (image_url) without
+    # writing into the cache
+    return dict(q) if q is not None else None
+
+
+def get_questions_by_ids(question_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch many questions in one query, keyed by id.
+
+    One IN (...) scan replaces a get_question_by_id round-trip per id.
+    Chunked at 900 ids to stay under SQLite's default variable limit.
+    """
+    questions: Dict[str, Dict[str, Any]] = {}
+    if not question_ids:
+        return questions
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(question_ids), 900):
+            chunk = question_ids[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT {_QUESTION_COLUMNS} FROM questions WHERE id IN ({placeholders})",
+                chunk)
+            for row in cursor.fetchall():
+                questions[row['id']] = _decode_question_row(row)
+    return questions
+
+
+def get_question_summary(question_id: str) -> Optional[Dict[str, Any]]:
+    """Get question metadata only, skipping the large TEXT columns."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_GET_QUESTION_SUMMARY_SQL, (question_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+# JSON-typed columns that need decoding when fetched
+_QUESTION_JSON_FIELDS = frozenset(('options', 'wrong_answer_explanations', 'learn_with_ai'))
+
+_QUESTION_COLUMN_SET = frozenset(_QUESTION_COLUMNS.replace(' ', '').split(','))
+
+
+def iter_all_questions(subject: Optional[str] = None, *, fields: Optional[List[str]] = None):
+    """Yield questions one at a time, optionally filtered by subject.
+
+    Streams rows in batches via fetchmany so callers can start consuming
+    before the full result set is materialized. With `fields`, only those
+    columns are selected (and decoded), so callers that just need ids or
+    metadata skip the JSON blobs entirely.
+    """
+    if fields is not None:
+        unknown = set(fields) - _QUESTION_COLUMN_SET
+        if unknown:
+            raise ValueError(f"Unknown question fields: {sorted(unknown)}")
+        select_list = ", ".join(fields)
+        json_fields = [f for f in fields if f in _QUESTION_JSON_FIELDS]
+    else:
+        select_list = _QUESTION_COLUMNS
+        json_fields = None
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        if subject:
+            cursor.execute(f"SELECT {select_list} FROM questions WHERE subject = ?", (subject,))
+        else:
+            cursor.execute(f"SELECT {select_list} FROM questions")
+        while True:
+            rows = cursor.fetchmany(500)
+            if not rows:
+                break
+            for row in rows:
+                if json_fields is None:
+                    yield _decode_question_row(row)
+                    continue
+                q = dict(row)
+                for field in json_fields:
+                    q[field] = _cached_json_loads(q[field]) if q[field] else {}
+                yield q
+
+
+def get_all_questions(subject: Optional[str] = None, *,
+                      fields: Optional[List[str]] = None,
+                      as_iterator: bool = False):
+    """Get all questions, optionally filtered by subject.
+
+    `fields` limits the selected columns; `as_iterator=True` returns the
+    streaming generator instead of a materialized list. The plain
+    materialized form is served from the in-memory question cache.
+    """
+    if fields is None and not as_iterator:
+        _ensure_question_cache()
+        if subject:
+            return list(_questions_by_subject.get(subject, ()))
+        return list(_question_cache.values())
+    questions = iter_all_questions(subject, fields=fields)
+    return questions if as_iterator else list(questions)
+
+
+# Subjects and chapters only change when the loaders run, so these lookups
+# are memoized; the loaders call cache_clear() after a reload.
+@lru_cache(maxsize=1)
+def get_subjects() -> List[str]:
+    """Get list of all subjects."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT subject FROM questions ORDER BY subject")
+        return [row[0] for row in cursor.fetchall()]
+
+
+# Session operations
+def create_session(user_id: int, mode: str, subjects: List[str], total_questions: int) -> Dict[str, Any]:
+    """Create a new study session and return the created row."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if _SUPPORTS_RETURNING:
+            cursor.execute(f"""
+                INSERT INTO sessions (user_id, mode, subjects, total_questions)
+                VALUES (?, ?, ?, ?)
+                RETURNING {_SESSION_COLUMNS}
+            """, (user_id, mode, _json_dumps(subjects), total_questions))
+        else:
+            cursor.execute("""
+                INSERT INTO sessions (user_id, mode, subjects, total_questions)
+                VALUES (?, ?, ?, ?)
+            """, (user_id, mode, _json_dumps(subjects), total_questions))
+            cursor.execute(f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE id = ?",
+                           (cursor.lastrowid,))
+        session = dict(cursor.fetchone())
+        session['subjects'] = _decode_subjects(session['subjects'])
+        return session
+
+
+_SESSION_COLUMNS = (
+    "id, user_id, started_at, ended_at, total_questions, correct_count, "
+    "subjects, mode"
+)
+
+
+def get_session(session_id: int) -> Optional[Dict[str, Any]]:
+    """Get a session by ID."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE id = ?", (session_id,))
+        row = cursor.fetchone()
+        if row:
+            s = dict(row)
+            s['subjects'] = _decode_subjects(s['subjects'])
+            return s
+        return None
+
+
+def update_session(session_id: int, correct_count: Optional[int] = None, ended: bool = False):
+    """Update session statistics.
+
+    Interim updates are a no-op: correct_count is always recomputable from
+    attempts, so writing it after every answer bought a transaction per
+    question for nothing. The single write happens at session end, deriving
+    the count from attempts unless the caller already has it.
+    """
+    if not ended:
+        return
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE sessions
+            SET correct_count = COALESCE(?, (
+                    SELECT COALESCE(SUM(correct), 0) FROM attempts WHERE session_id = ?
+                )),
+                ended_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (correct_count, session_id, session_id))
+
+
+def get_user_sessions(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+    """Get recent sessions for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        cursor.execute("""
+            SELECT * FROM sessions
+            WHERE user_id = ?
+            ORDER BY started_at DESC
+            LIMIT ?
+        """, (user_id, limit))
+        sessions = cursor.fetchall()
+        for s in sessions:
+            s['subjects'] = _decode_subjects(s['subjects'])
+        return sessions
+
+
+# Attempt operations
+# INSERT ... SELECT so the denormalized topic columns come straight from
+# the questions row in the same statement
+_RECORD_ATTEMPT_SQL = """
+    INSERT INTO attempts
+    (user_id, question_id, session_id, correct, selected_answer,
+     time_taken_seconds, timed_out, error_type, subject, chapter, chapter_title)
+    SELECT ?, id, ?, ?, ?, ?, ?, ?, subject, chapter, chapter_title
+    FROM questions WHERE id = ?
+"""
+
+_UPDATE_TOPIC_STATS_SQL = """
+    INSERT INTO topic_stats (user_id, subject, chapter, chapter_title,
+                             correct, total, last_at)
+    SELECT ?, subject, chapter, chapter_title, ?, 1, CURRENT_TIMESTAMP
+    FROM questions WHERE id = ?
+    ON CONFLICT(user_id, subject, chapter) DO UPDATE SET
+        correct = correct + excluded.correct,
+        total = total + 1,
+        last_at = CURRENT_TIMESTAMP
+"""
+
+
+def record_attempt(user_id: int, question_id: str, session_id: int,
+                   correct: bool, selected_answer: str,
+                   time_taken_seconds: float, timed_out: bool = False,
+                   error_type: str = None):
+    """Record a question attempt.
+
+    The attempt insert and any follow-up review scheduling share one
+    transaction, so each answered question costs a single commit.
+    """
+    _recommendation_cache.pop(user_id, None)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_RECORD_ATTEMPT_SQL,
+                       (user_id, session_id, correct, selected_answer,
+                        time_taken_seconds, timed_out, error_type, question_id))
+        cursor.execute(_UPDATE_TOPIC_STATS_SQL,
+                       (user_id, 1 if correct else 0, question_id))
+
+        if not correct:
+            schedule_question_review(user_id, question_id, 1, 'day_1', cursor=cursor)
+            schedule_question_review(user_id, question_id, 7, 'day_7', cursor=cursor)
+
+
+def record_attempts(attempts: List[tuple]):
+    """Record many attempts in one transaction.
+
+    Each tuple matches record_attempt's arguments: (user_id, question_id,
+    session_id, correct, selected_answer, time_taken_seconds, timed_out,
+    error_type). Batch submissions (e.g. a timed block) share one commit
+    via executemany instead of one transaction per answer.
+    """
+    for attempt in attempts:
+        _recommendation_cache.pop(attempt[0], None)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(_RECORD_ATTEMPT_SQL,
+                           [(a[0], a[2], a[3], a[4], a[5], a[6], a[7], a[1])
+                            for a in attempts])
+        cursor.executemany(_UPDATE_TOPIC_STATS_SQL,
+                           [(a[0], 1 if a[3] else 0, a[1]) for a in attempts])
+        for user_id, question_id, _, correct, *_rest in attempts:
+            if not correct:
+                schedule_question_review(user_id, question_id, 1, 'day_1', cursor=cursor)
+                schedule_question_review(user_id, question_id, 7, 'day_7', cursor=cursor)
+
+
+def get_session_attempts(session_id: int) -> List[Dict[str, Any]]:
+    """Get all attempts for a session."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        cursor.execute("""
+            SELECT id, user_id, question_id, session_id, correct,
+                   selected_answer, time_taken_seconds, timed_out,
+                   answered_at, error_type, subject, chapter, chapter_title
+            FROM attempts
+            WHERE session_id = ?
+            ORDER BY answered_at
+        """, (session_id,))
+        return cursor.fetchall()
+
+
+def get_topic_accuracy(user_id: int) -> Dict[str, Dict[str, Any]]:
+    """Get accuracy statistics by topic for a user.
+
+    Reads the topic_stats summary maintained by record_attempt, so the cost is
+    O(topics) rather than an aggregate over every attempt.
+    """
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        # Accuracy and recency are computed in SQL so Python gets dict rows
+        # straight from the factory.
+        cursor.execute("""
+            SELECT
+                subject,
+                chapter,
+                chapter_title,
+                correct,
+                total,
+                COALESCE(CAST(correct AS REAL) / NULLIF(total, 0), 0) as accuracy,
+                COALESCE(JULIANDAY('now') - JULIANDAY(last_at), 0) as days_since_last
+            FROM topic_stats
+            WHERE user_id = ?
+        """, (user_id,))
+
+        return {f"{row['subject']}_{row['chapter']}": row
+                for row in cursor.fetchall()}
+
+
+# One round-trip for the whole stats payload: CTEs share the attempts cursor
+# and json_object/json_group_object assemble the nested result inside SQLite,
+# so Python does a single fetch and a single JSON decode.
+_USER_STATS_SQL = """
+    WITH overall AS (
+        SELECT COUNT(*) as n,
+               COALESCE(SUM(correct), 0) as c,
+               COALESCE(AVG(time_taken_seconds), 0) as t
+        FROM attempts WHERE user_id = ?
+    ),
+    bysubj AS (
+        -- Index-only scan of idx_attempts_user_subject; no questions probe
+        SELECT subject, COUNT(*) as total, SUM(correct) as correct
+        FROM attempts
+        WHERE user_id = ?
+        GROUP BY subject
+    ),
+    trend AS (
+        SELECT answered_date as date, COUNT(*) as total, SUM(correct) as correct
+        FROM attempts
+        WHERE user_id = ? AND answered_date >= DATE('now', '-7 days')
+        GROUP BY answered_date
+    )
+    SELECT json_object(
+        'total_attempts', (SELECT n FROM overall),
+        'correct_attempts', (SELECT c FROM overall),
+        'accuracy', (SELECT CASE WHEN n > 0 THEN c * 100.0 / n ELSE 0 END FROM overall),
+        'avg_time_seconds', (SELECT t FROM overall),
+        'session_count', (SELECT COUNT(*) FROM sessions WHERE user_id = ?),
+        'by_subject', (SELECT COALESCE(json_group_object(subject, json_object(
+                           'total', total,
+                           'correct', correct,
+                           'accuracy', CAST(correct AS REAL) / total)), json_object())
+                       FROM bysubj),
+        'recent_trend', (SELECT COALESCE(json_group_array(json_object(
+                             'date', date,
+                             'total', total,
+                             'correct', correct)), json_array())
+                         FROM (SELECT * FROM trend ORDER BY date))
+    )
+"""
+
+
+def get_user_stats(user_id: int) -> Dict[str, Any]:
+    """Get overall statistics for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_USER_STATS_SQL, (user_id, user_id, user_id, user_id))
+        return _json_loads(cursor.fetchone()[0])
+
+
+_SESSION_QUESTION_IDS_SQL = "SELECT question_id FROM attempts WHERE session_id = ?"
+
+_RECENT_QUESTION_IDS_SQL = """
+    SELECT DISTINCT question_id FROM attempts
+    WHERE user_id = ?
+    ORDER BY answered_at DESC
+    LIMIT ?
+"""
+
+
+def get_questions_asked_in_session(session_id: int) -> frozenset:
+    """Get the set of question IDs already asked in a session.
+
+    Callers only do membership tests, so the rows go straight into a
+    frozenset; idx_attempts_session_qid makes the query an index-only scan.
+    """
+    with get_read_connection() as conn:
+        # Plain tuples: no sqlite3.Row bookkeeping for a single-column result
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return frozenset(qid for (qid,) in cursor.execute(_SESSION_QUESTION_IDS_SQL, (session_id,)))
+
+
+def get_recent_question_ids(user_id: int, limit: int = 50) -> List[str]:
+    """Get recently asked question IDs for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        return [qid for (qid,) in cursor.execute(_RECENT_QUESTION_IDS_SQL, (user_id, limit))]
+
+
+def load_flashcards_from_json():
+    """Load flashcards from JSON files into the database."""
+    data_dir = Path(__file__).parent / "data" / "flashcards"
+
+    if not data_dir.exists():
+        print(f"Warning: Flashcards directory not found at {data_dir}")
+        return
+
+    flashcard_files = list(data_dir.glob("flashcards_*.json"))
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Same single-statement json_each ingest as the question loader: one
+        # write transaction for the whole load, no FK bookkeeping, and no
+        # fsync until the PRAGMA is restored after the explicit commit.
+        cursor.execute("PRAGMA foreign_keys=OFF")
+        cursor.execute("PRAGMA defer_foreign_keys=ON")
+        cursor.execute("PRAGMA synchronous=OFF")
+        try:
+            _load_flashcard_files(cursor, flashcard_files)
+            conn.commit()
+        finally:
+            cursor.execute("PRAGMA synchronous=NORMAL")
+
+    get_flashcard_subjects.cache_clear()
+    get_flashcard_chapters.cache_clear()
+    get_flashcard_by_id.cache_clear()
+    _flashcard_stats_cache.clear()
+
+
+def _load_flashcard_files(cursor, flashcard_files):
+    """Ingest each flashcard file inside one IMMEDIATE transaction."""
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("DROP INDEX IF EXISTS idx_flashcards_subject")
+
+    total_loaded = 0
+    for filepath in flashcard_files:
+        if filepath.name == "flashcards_summary.json":
+            continue
+
+        try:
+            blob = filepath.read_text(encoding='utf-8')
+            cursor.execute("""
+                INSERT OR REPLACE INTO flashcards
+                (id, subject, chapter, chapter_title, term, definition, mnemonic, category)
+                SELECT json_extract(value, '$.id'),
+                       json_extract(value, '$.subject'),
+                       json_extract(value, '$.chapter'),
+                       json_extract(value, '$.chapter_title'),
+                       json_extract(value, '$.term'),
+                       json_extract(value, '$.definition'),
+                       COALESCE(json_extract(value, '$.mnemonic'), ''),
+                       COALESCE(json_extract(value, '$.category'), 'general')
+                FROM json_each(?, '$.flashcards')
+            """, (blob,))
+            total_loaded += cursor.rowcount
+
+            print(f"Loaded {cursor.rowcount} flashcards from {filepath.name}")
+        except Exception as e:
+            print(f"Error loading {filepath}: {e}")
+
+    cursor.execute("CREATE INDEX idx_flashcards_subject ON flashcards(subject)")
+    cursor.execute("ANALYZE flashcards")
+
+    print(f"Total flashcards loaded: {total_loaded}")
+
+
+# Flashcard operations
+# Memoized like the question cache: flashcards only change when the
+# loader runs (which clears this), and callers treat the dict as
+# read-only response data.
+@lru_cache(maxsize=4096)
+def get_flashcard_by_id(flashcard_id: str) -> Optional[Dict[str, Any]]:
+    """Get a flashcard by ID."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM flashcards WHERE id = ?", (flashcard_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def get_all_flashcards(subject: Optional[str] = None, chapter: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Get all flashcards, optionally filtered by subject and/or chapter."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        query = "SELECT * FROM flashcards WHERE 1=1"
+        params = []
+
+        if subject:
+            query += " AND subject = ?"
+            params.append(subject)
+        if chapter:
+            query += " AND chapter = ?"
+            params.append(chapter)
+
+        query += " ORDER BY subject, chapter, id"
+        cursor.row_factory = _dict_row
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+@lru_cache(maxsize=1)
+def get_flashcard_subjects() -> List[str]:
+    """Get list of all flashcard subjects."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT subject FROM flashcards ORDER BY subject")
+        return [row[0] for row in cursor.fetchall()]
+
+
+@lru_cache(maxsize=32)
+def get_flashcard_chapters(subject: str) -> List[Dict[str, Any]]:
+    """Get chapters available for a subject with flashcard counts."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        cursor.execute("""
+            SELECT chapter, chapter_title, COUNT(*) as count
+            FROM flashcards
+            WHERE subject = ?
+            GROUP BY chapter
+            ORDER BY chapter
+        """, (subject,))
+        return cursor.fetchall()
+
+
+def get_flashcard_count(subject: Optional[str] = None, chapter: Optional[int] = None) -> int:
+    """Get count of flashcards."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        query = "SELECT COUNT(*) FROM flashcards WHERE 1=1"
+        params = []
+
+        if subject:
+            query += " AND subject = ?"
+            params.append(subject)
+        if chapter:
+            query += " AND chapter = ?"
+            params.append(chapter)
+
+        cursor.execute(query, params)
+        return cursor.fetchone()[0]
+
+
+# Flashcard session operations
+def create_flashcard_session(user_id: int, subjects: List[str], total_cards: int) -> int:
+    """Create a new flashcard study session."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO flashcard_sessions (user_id, subjects, total_cards)
+            VALUES (?, ?, ?)
+        """, (user_id, _json_dumps(subjects), total_cards))
+        return cursor.lastrowid
+
+
+def get_flashcard_session(session_id: int) -> Optional[Dict[str, Any]]:
+    """Get a flashcard session by ID."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM flashcard_sessions WHERE id = ?", (session_id,))
+        row = cursor.fetchone()
+        if row:
+            s = dict(row)
+            s['subjects'] = _decode_subjects(s['subjects'])
+            return s
+        return None
+
+
+def update_flashcard_session(session_id: int, correct_count: Optional[int] = None, ended: bool = False):
+    """Update flashcard session statistics.
+
+    Same end-of-session-only policy as update_session; the count derives
+    from flashcard_reviews when not supplied.
+    """
+    if not ended:
+        return
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE flashcard_sessions
+            SET correct_count = COALESCE(?, (
+                    SELECT COALESCE(SUM(correct), 0) FROM flashcard_reviews WHERE session_id = ?
+                )),
+                ended_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (correct_count, session_id, session_id))
+
+
+# Flashcard review operations (spaced repetition)
+# Decoded stats payload per user, dropped whenever that user records a
+# review. Stats rarely change between consecutive page loads, so most
+# dashboard hits skip the CTE query entirely. The date is part of the
+# entry because due_today/new_cards are relative to today. In-process
+# invalidation does the job of the version-counter scheme because the app
+# runs as a single process and all writes go through this module.
+_flashcard_stats_cache: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+
+# SM-2 as one UPSERT: the VALUES row covers first-ever reviews (prior
+# state ease 2.5 / interval 1) and DO UPDATE applies the transition to the
+# stored row, so state read, computation and write collapse into a single
+# statement. Named parameters because :correct and :today appear in
+# several CASE arms. RETURNING feeds the history insert below.
+_RECORD_FLASHCARD_REVIEW_STATE_SQL = """
+    INSERT INTO flashcard_state (user_id, flashcard_id, ease_factor,
+                                 interval_days, next_review_date)
+    VALUES (:uid, :fid,
+            CASE WHEN :correct THEN 2.6 ELSE 2.3 END,
+            CASE WHEN :correct THEN 6 ELSE 1 END,
+            DATE(:today, '+' || CASE WHEN :correct THEN 6 ELSE 1 END || ' days'))
+    ON CONFLICT(user_id, flashcard_id) DO UPDATE SET
+        ease_factor = MAX(1.3, ease_factor + CASE WHEN :correct THEN 0.1 ELSE -0.2 END),
+        interval_days = CASE WHEN :correct THEN
+                CASE WHEN interval_days = 1 THEN 6
+                     ELSE CAST(interval_days * ease_factor AS INTEGER) END
+            ELSE 1 END,
+        next_review_date = DATE(:today, '+' ||
+                CASE WHEN :correct THEN
+                    CASE WHEN interval_days = 1 THEN 6
+                         ELSE CAST(interval_days * ease_factor AS INTEGER) END
+                ELSE 1 END || ' days')
+    RETURNING ease_factor, interval_days, next_review_date
+"""
+
+
+def record_flashcard_review(user_id: int, flashcard_id: str, session_id: int,
+                            correct: bool, time_taken_seconds: float):
+    """Record a flashcard review with spaced repetition calculations."""
+    _flashcard_stats_cache.pop(user_id, None)
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        if _SUPPORTS_RETURNING:
+            cursor.execute(_RECORD_FLASHCARD_REVIEW_STATE_SQL,
+                           {'uid': user_id, 'fid': flashcard_id,
+                            'correct': 1 if correct else 0,
+                            'today': datetime.now().strftime('%Y-%m-%d')})
+            ease_factor, interval, next_review = cursor.fetchone()
+        else:
+            # Fallback for SQLite < 3.35: state read and SM-2 in Python
+            cursor.execute("""
+                SELECT ease_factor, interval_days
+                FROM flashcard_state
+                WHERE user_id = ? AND flashcard_id = ?
+            """, (user_id, flashcard_id))
+            state = cursor.fetchone()
+            ease_factor = state['ease_factor'] if state else 2.5
+            interval = state['interval_days'] if state else 1
+
+            if correct:
+                interval = 6 if interval == 1 else int(interval * ease_factor)
+                ease_factor = max(1.3, ease_factor + 0.1)
+            else:
+                interval = 1
+                ease_factor = max(1.3, ease_factor - 0.2)
+
+            next_review = (datetime.now() + timedelta(days=interval)).strftime('%Y-%m-%d')
+            cursor.execute("""
+                INSERT INTO flashcard_state (user_id, flashcard_id, ease_factor,
+                                             interval_days, next_review_date)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, flashcard_id) DO UPDATE SET
+                    ease_factor = excluded.ease_factor,
+                    interval_days = excluded.interval_days,
+                    next_review_date = excluded.next_review_date
+            """, (user_id, flashcard_id, ease_factor, interval, next_review))
+
+        cursor.execute("""
+            INSERT INTO flashcard_reviews
+            (user_id, flashcard_id, session_id, correct, time_taken_seconds,
+             ease_factor, interval_days, next_review_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, flashcard_id, session_id, correct, time_taken_seconds,
+              ease_factor, interval, next_review))
+
+
+# flashcard_state is the materialized latest-review-per-card, so the due
+# scan is one primary-key probe per card instead of the correlated seek
+# into the review history this query used to do.
+_DUE_FLASHCARDS_SQL = """
+    SELECT f.*, fs.next_review_date, fs.ease_factor, fs.interval_days
+    FROM flashcards f
+    LEFT JOIN flashcard_state fs ON fs.user_id = ? AND fs.flashcard_id = f.id
+    WHERE (fs.next_review_date IS NULL OR fs.next_review_date <= ?)
+"""
+
+
+def get_due_flashcards(user_id: int, subject: Optional[str] = None,
+                       limit: int = 20) -> List[Dict[str, Any]]:
+    """Get flashcards that are due for review (spaced repetition)."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+
+        query = _DUE_FLASHCARDS_SQL
+        # Bound constant instead of DATE('now'): the planner sees a literal
+        # for the range predicate and the SQL text stays cacheable
+        params = [user_id, datetime.now().strftime('%Y-%m-%d')]
+
+        if subject:
+            query += " AND f.subject = ?"
+            params.append(subject)
+
+        # Order: due cards first (by date), then new cards
+        query += " ORDER BY fs.next_review_date IS NULL, fs.next_review_date LIMIT ?"
+        params.append(limit)
+
+        cursor.row_factory = _dict_row
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+# The whole flashcard stats payload in one statement, mirroring
+# _USER_STATS_SQL: CTEs share the scans and json_object assembles the nested
+# result, so Python does one fetch and one JSON decode.
+_FLASHCARD_STATS_SQL = """
+    WITH overall AS (
+        SELECT COUNT(*) as n,
+               COALESCE(SUM(correct), 0) as c,
+               COALESCE(AVG(time_taken_seconds), 0) as t
+        FROM flashcard_reviews WHERE user_id = ?
+    ),
+    inventory AS (
+        SELECT COUNT(*) as total_cards,
+               COALESCE(SUM(CASE WHEN fs.flashcard_id IS NULL THEN 1 ELSE 0 END), 0) as new_cards,
+               COALESCE(SUM(CASE WHEN fs.next_review_date <= ? THEN 1 ELSE 0 END), 0) as due_today
+        FROM flashcards f
+        LEFT JOIN flashcard_state fs ON fs.flashcard_id = f.id AND fs.user_id = ?
+    ),
+    bysubj AS (
+        -- Per-card grouping happens once in the inner query (an index-only
+        -- scan of idx_flashcard_reviews_user_card_time), so the outer GROUP
+        -- BY sums plain rows instead of deduping with COUNT(DISTINCT)
+        SELECT f.subject,
+               COUNT(*) as reviewed,
+               SUM(agg.correct) as correct,
+               SUM(agg.total) as total_reviews
+        FROM (
+            SELECT flashcard_id, SUM(correct) as correct, COUNT(*) as total
+            FROM flashcard_reviews
+            WHERE user_id = ?
+            GROUP BY flashcard_id
+        ) agg
+        JOIN flashcards f ON f.id = agg.flashcard_id
+        GROUP BY f.subject
+    )
+    SELECT json_object(
+        'total_reviews', (SELECT n FROM overall),
+        'correct_reviews', (SELECT c FROM overall),
+        'accuracy', (SELECT CASE WHEN n > 0 THEN c * 100.0 / n ELSE 0 END FROM overall),
+        'avg_time_seconds', (SELECT t FROM overall),
+        'total_cards', (SELECT total_cards FROM inventory),
+        'mastered', (SELECT COUNT(*) FROM flashcard_state
+                     WHERE user_id = ? AND interval_days >= 21),
+        'learning', (SELECT COUNT(*) FROM flashcard_state
+                     WHERE user_id = ? AND interval_days < 21),
+        'new_cards', (SELECT new_cards FROM inventory),
+        'due_today', (SELECT due_today FROM inventory),
+        'by_subject', (SELECT COALESCE(json_group_object(subject, json_object(
+                           'reviewed', reviewed,
+                           'correct', correct,
+                           'total_reviews', total_reviews,
+                           'accuracy', CAST(correct AS REAL) / total_reviews)), json_object())
+                       FROM bysubj)
+    )
+"""
+
+
+def get_flashcard_stats(user_id: int) -> Dict[str, Any]:
+    """Get flashcard statistics for a user."""
+    today = datetime.now().strftime('%Y-%m-%d')
+    cached = _flashcard_stats_cache.get(user_id)
+    if cached is not None and cached[0] == today:
+        return cached[1]
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        # Placeholder order is textual: overall, the due-date CASE in the
+        # inventory SELECT list, then the inventory join, bysubj, mastered,
+        # learning
+        cursor.execute(_FLASHCARD_STATS_SQL,
+                       (user_id, today, user_id, user_id, user_id, user_id))
+        payload = cursor.fetchone()[0]
+    stats = _json_loads(payload)
+    _flashcard_stats_cache[user_id] = (today, stats)
+    return stats
+
+
+def get_flashcard_stats_bulk(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Get flashcard statistics for many users in one query.
+
+    Same payload shape as get_flashcard_stats, grouped by user so a
+    leaderboard for N users costs one round-trip instead of N. The
+    single-user path keeps its dedicated one-row query.
+    """
+    if not user_ids:
+        return {}
+    placeholders = ",".join("?" * len(user_ids))
+    sql = f"""
+        WITH overall AS (
+            SELECT user_id, COUNT(*) as n,
+                   COALESCE(SUM(correct), 0) as c,
+                   COALESCE(AVG(time_taken_seconds), 0) as t
+            FROM flashcard_reviews
+            WHERE user_id IN ({placeholders})
+            GROUP BY user_id
+        ),
+        state AS (
+            SELECT user_id,
+                   SUM(interval_days >= 21) as mastered,
+                   SUM(interval_days < 21) as learning,
+                   SUM(next_review_date <= ?) as due_today,
+                   COUNT(*) as reviewed_cards
+            FROM flashcard_state
+            WHERE user_id IN ({placeholders})
+            GROUP BY user_id
+        ),
+        bysubj AS (
+            SELECT agg.user_id, f.subject,
+                   COUNT(*) as reviewed,
+                   SUM(agg.correct) as correct,
+                   SUM(agg.total) as total_reviews
+            FROM (
+                SELECT user_id, flashcard_id, SUM(correct) as correct, COUNT(*) as total
+                FROM flashcard_reviews
+                WHERE user_id IN ({placeholders})
+                GROUP BY user_id, flashcard_id
+            ) agg
+            JOIN flashcards f ON f.id = agg.flashcard_id
+            GROUP BY agg.user_id, f.subject
+        ),
+        cards AS (SELECT COUNT(*) as total_cards FROM flashcards)
+        SELECT u.id, json_object(
+            'total_reviews', COALESCE(o.n, 0),
+            'correct_reviews', COALESCE(o.c, 0),
+            'accuracy', CASE WHEN COALESCE(o.n, 0) > 0 THEN o.c * 100.0 / o.n ELSE 0 END,
+            'avg_time_seconds', COALESCE(o.t, 0),
+            'total_cards', (SELECT total_cards FROM cards),
+            'mastered', COALESCE(s.mastered, 0),
+            'learning', COALESCE(s.learning, 0),
+            'new_cards', (SELECT total_cards FROM cards) - COALESCE(s.reviewed_cards, 0),
+            'due_today', COALESCE(s.due_today, 0),
+            'by_subject', COALESCE((SELECT json_group_object(subject, json_object(
+                              'reviewed', reviewed,
+                              'correct', correct,
+                              'total_reviews', total_reviews,
+                              'accuracy', CAST(correct AS REAL) / total_reviews))
+                          FROM bysubj b WHERE b.user_id = u.id), json_object())
+        )
+        FROM users u
+        LEFT JOIN overall o ON o.user_id = u.id
+        LEFT JOIN state s ON s.user_id = u.id
+        WHERE u.id IN ({placeholders})
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    params = [*user_ids, today, *user_ids, *user_ids, *user_ids]
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return {row[0]: _json_loads(row[1]) for row in cursor.fetchall()}
+
+
+def get_user_flashcard_sessions(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+    """Get recent flashcard sessions for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = _dict_row
+        cursor.execute("""
+            SELECT * FROM flashcard_sessions
+            WHERE user_id = ?
+            ORDER BY started_at DESC
+            LIMIT ?
+        """, (user_id, limit))
+        sessions = cursor.fetchall()
+        for s in sessions:
+            s['subjects'] = _decode_subjects(s['subjects'])
+        return sessions
+
+
+# ============== STUDY STREAK OPERATIONS ==============
+
+def update_study_streak(user_id: int):
+    """Update the study streak for a user after they answer a question."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        # Get current streak info
+        cursor.execute("""
+            SELECT current_streak, longest_streak, last_study_date
+            FROM study_streaks WHERE user_id = ?
+        """, (user_id,))
+        row = cursor.fetchone()
+
+        if not row:
+            # First time studying
+            cursor.execute("""
+                INSERT INTO study_streaks (user_id, current_streak, longest_streak, last_study_date)
+                VALUES (?, 1, 1, ?)
+            """, (user_id, today))
+        else:
+            last_date = row['last_study_date']
+            current = row['current_streak']
+            longest = row['longest_streak']
+
+            if last_date == today:
+                # Already studied today, no change
+                pass
+            elif last_date == (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d'):
+                # Studied yesterday, increment streak
+                current += 1
+                longest = max(longest, current)
+                cursor.execute("""
+                    UPDATE study_streaks
+                    SET current_streak = ?, longest_streak = ?, last_study_date = ?
+                    WHERE user_id = ?
+                """, (current, longest, today, user_id))
+            else:
+                # Streak broken, start over
+                cursor.execute("""
+                    UPDATE study_streaks
+                    SET current_streak = 1, last_study_date = ?
+                    WHERE user_id = ?
+                """, (today, user_id))
+
+
+def get_study_streak(user_id: int) -> Dict[str, Any]:
+    """Get the current study streak for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT current_streak, longest_streak, last_study_date
+            FROM study_streaks WHERE user_id = ?
+        """, (user_id,))
+        row = cursor.fetchone()
+
+        if not row:
+            return {"current_streak": 0, "longest_streak": 0, "last_study_date": None}
+
+        # Check if streak is still valid
+        today = datetime.now().strftime('%Y-%m-%d')
+        yesterday = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+
+        if row['last_study_date'] not in [today, yesterday]:
+            # Streak is broken
+            return {"current_streak": 0, "longest_streak": row['longest_streak'], "last_study_date": row['last_study_date']}
+
+        return dict(row)
+
+
+# ============== DAILY GOAL OPERATIONS ==============
+
+def get_daily_goal(user_id: int) -> int:
+    """Get the daily question goal for a user."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT daily_question_goal FROM daily_goals WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        return row['daily_question_goal'] if row else 30
+
+
+def set_daily_goal(user_id: int, goal: int):
+    """Set the daily question goal for a user."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO daily_goals (user_id, daily_question_goal)
+            VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET daily_question_goal = ?
+        """, (user_id, goal, goal))
+
+
+def get_daily_progress(user_id: int) -> Dict[str, Any]:
+    """Get today's progress toward the daily goal."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        cursor.execute("""
+            SELECT COUNT(*) as answered, SUM(correct) as correct
+            FROM attempts
+            WHERE user_id = ? AND answered_date = ?
+        """, (user_id, today))
+        row = cursor.fetchone()
+
+        goal = get_daily_goal(user_id)
+        answered = row['answered'] or 0
+        correct = row['correct'] or 0
+
+        return {
+            "goal": goal,
+            "answered": answered,
+            "correct": correct,
+            "progress_percent": min(100, (answered / goal * 100)) if goal > 0 else 0,
+            "goal_met": answered >= goal
+        }
+
+
+# ============== QUESTION REVIEW SCHEDULING ==============
+
+def schedule_question_review(user_id: int, question_id: str, days_from_now: int,
+                             review_type: str, cursor=None):
+    """Schedule a question for review after X days.
+
+    Pass an existing cursor to run inside the caller's transaction (as
+    record_attempt does); otherwise a transaction is opened here.
+    """
+    if cursor is None:
+        with get_connection() as conn:
+            schedule_question_review(user_id, question_id, days_from_now,
+                                     review_type, cursor=conn.cursor())
+        return
+
+    scheduled_date = (datetime.now() + timedelta(days=days_from_now)).strftime('%Y-%m-%d')
+
+    # One statement instead of SELECT-then-INSERT: the WHERE NOT EXISTS
+    # keeps the old "skip while an uncompleted review of this type is
+    # pending" behavior, and OR IGNORE backstops it with the unique index
+    # under concurrent writers
+    cursor.execute("""
+        INSERT OR IGNORE INTO question_reviews
+        (user_id, question_id, scheduled_date, review_type)
+        SELECT ?, ?, ?, ?
+        WHERE NOT EXISTS (
+            SELECT 1 FROM question_reviews
+            WHERE user_id = ? AND question_id = ? AND review_type = ?
+              AND completed = FALSE
+        )
+    """, (user_id, question_id, scheduled_date, review_type,
+          user_id, question_id, review_type))
+
+
+def get_due_question_reviews(user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
+    """Get questions due for review today or earlier."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        cursor.row_factory = _dict_row
+        cursor.execute("""
+            SELECT qr.*, q.subject, q.chapter, q.chapter_title, q.question_text
+            FROM question_reviews qr
+            JOIN questions q ON qr.question_id = q.id
+            WHERE qr.user_id = ? AND qr.scheduled_date <= ? AND qr.completed = FALSE
+            ORDER BY qr.scheduled_date ASC
+            LIMIT ?
+        """, (user_id, today, limit))
+
+        return cursor.fetchall()
+
+
+def complete_question_review(user_id: int, question_id: str, review_type: str):
+    """Mark a scheduled review as completed."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE question_reviews
+            SET completed = TRUE, completed_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND question_id = ? AND review_type = ? AND completed = FALSE
+        """, (user_id, question_id, review_type))
+
+
+# ============== ERROR NOTEBOOK & LEECH DETECTION ==============
+
+def update_error_type(attempt_id: int, error_type: str):
+    """Update the error type for an attempt."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE attempts SET error_type = ? WHERE id = ?
+        """, (error_type, attempt_id))
+
+
+def get_missed_questions(user_id: int, subject: str = None, error_type: str = None,
+                          limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    """Get all missed questions for the error notebook."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+
+        query = """
+            SELECT a.id as attempt_id, a.question_id, a.selected_answer, a.error_type,
+                   a.time_taken_seconds, a.answered_at, a.session_id,
+                   q.subject, q.chapter, q.chapter_title, q.question_text,
+                   q.correct_answer, q.explanation, q.short_reason
+            FROM attempts a
+            JOIN questions q ON a.question_id = q.id
+            WHERE a.user_id = ? AND a.correct = FALSE
+        """
+        params = [user_id]
+
+        if subject:
+            query += " AND q.subject = ?"
+            params.append(subject)
+
+        if error_type:
+            query += " AND a.error_type = ?"
+            params.append(error_type)
+
+        query += " ORDER BY a.answered_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        cursor.row_factory = _dict_row
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+
+def get_error_type_stats(user_id: int) -> Dict[str, int]:
+    """Get counts of each error type."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT error_type, COUNT(*) as count
+            FROM attempts
+            WHERE user_id = ? AND correct = FALSE AND error_type IS NOT NULL
+            GROUP BY error_type
+        """, (user_id,))
+
+        return {row['error_type']: row['count'] for row in cursor.fetchall()}
+
+
+def get_leech_questions(user_id: int, min_wrong_count: int = 3) -> List[Dict[str, Any]]:
+    """Get questions that have been missed 3+ times (leeches)."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT q.*, COUNT(*) as wrong_count,
+                   MAX(a.answered_at) as last_wrong
+            FROM attempts a
+            JOIN questions q ON a.question_id = q.id
+            WHERE a.user_id = ? AND a.correct = FALSE
+            GROUP BY a.question_id
+            HAVING COUNT(*) >= ?
+            ORDER BY wrong_count DESC
+        """, (user_id, min_wrong_count))
+
+        results = []
+        for row in cursor.fetchall():
+            q = dict(row)
+            q['options'] = _cached_json_loads(q['options'])
+            if q.get('wrong_answer_explanations'):
+                try:
+                    q['wrong_answer_explanations'] = _cached_json_loads(q['wrong_answer_explanations'])
+                except (json.JSONDecodeError, TypeError):
+                    q['wrong_answer_explanations'] = {}
+            results.append(q)
+        return results
+
+
+# ============== ENHANCED STATS ==============
+
+def get_time_accuracy_stats(user_id: int) -> Dict[str, Any]:
+    """Get time vs accuracy statistics."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+
+        # Average time by correctness
+        cursor.execute("""
+            SELECT correct, AVG(time_taken_seconds) as avg_time, COUNT(*) as count
+            FROM attempts
+            WHERE user_id = ? AND time_taken_seconds IS NOT NULL
+            GROUP BY correct
+        """, (user_id,))
+
+        by_correct = {bool(row['correct']): {'avg_time': row['avg_time'], 'count': row['count']}
+                      for row in cursor.fetchall()}
+
+        # Time by subject
+        cursor.execute("""
+            SELECT q.subject, AVG(a.time_taken_seconds) as avg_time,
+                   SUM(a.correct) as correct,
+                   COUNT(*) as total
+            FROM attempts a
+            JOIN questions q ON a.question_id = q.id
+            WHERE a.user_id = ? AND a.time_taken_seconds IS NOT NULL
+            GROUP BY q.subject
+        """, (user_id,))
+
+        by_subject = {row['subject']: {
+            'avg_time': row['avg_time'],
+            'accuracy': row['correct'] / row['total'] if row['total'] > 0 else 0,
+            'total': row['total']
+        } for row in cursor.fetchall()}
+
+        # Slow + Wrong questions (took > 60 seconds and got wrong)
+        cursor.execute("""
+            SELECT a.question_id, q.subject, q.chapter, q.chapter_title,
+                   q.question_text, a.time_taken_seconds
+            FROM attempts a
+            JOIN questions q ON a.question_id = q.id
+            WHERE a.user_id = ? AND a.correct = FALSE AND a.time_taken_seconds > 60
+            ORDER BY a.time_taken_seconds DESC
+            LIMIT 10
+        """, (user_id,))
+
+        slow_wrong = [dict(row) for row in cursor.fetchall()]
+
+        return {
+            "by_correctness": by_correct,
+            "by_subject": by_subject,
+            "slow_and_wrong": slow_wrong
+        }
+
+
+def get_score_trend(user_id: int, days: int = 30) -> Dict[str, Any]:
+    """Get score trends over time."""
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+
+        # Daily accuracy over time
+        cursor.execute("""
+            SELECT answered_date as date,
+                   COUNT(*) as total,
+                   SUM(correct) as correct
+            FROM attempts
+            WHERE user_id = ? AND answered_date >= DATE('now', ?)
+            GROUP BY answered_date
+            ORDER BY date
+        """, (user_id, f'-{days} days'))
+
+        daily_stats = []
+        for row in cursor.fetchall():
+            daily_stats.append({
+                'date': row['date'],
+                'total': row['total'],
+                'correct': row['correct'],
+                'accuracy': (row['correct'] / row['total'] * 100) if row['total'] > 0 else 0
+            })
+
+        # Calculate trend (improvement over time)
+        if len(daily_stats) >= 2:
+            first_half = daily_stats[:len(daily_stats)//2]
+            second_half = daily_stats[len(daily_stats)//2:]
+
+            first_accuracy = sum(d['correct'] for d in first_half) / max(1, sum(d['total'] for d in first_half)) * 100
+            second_accuracy = sum(d['correct'] for d in second_half) / max(1, sum(d['total'] for d in second_half)) * 100
+
+            trend = second_accuracy - first_accuracy
+            trend_direction = 'improving' if trend > 2 else ('declining' if trend < -2 else 'stable')
+        else:
+            trend = 0
+            trend_direction = 'insufficient_data'
+
+        return {
+            "daily_stats": daily_stats,
+            "trend_percent": round(trend, 1),
+            "trend_direction": trend_direction
+        }
+
+
+# Everything the recommendation needs, as counts, in one statement: the
+# previous version called get_daily_progress, get_due_question_reviews
+# and get_leech_questions, which fetched (and JSON-decoded) full rows
+# only to take len() of them.
+_SMART_RECOMMENDATION_SQL = """
+    SELECT json_object(
+        'goal', COALESCE((SELECT daily_question_goal FROM daily_goals
+                          WHERE user_id = :uid), 30),
+        'answered_today', (SELECT COUNT(*) FROM attempts
+                           WHERE user_id = :uid AND answered_date = :today),
+        'due_reviews', (SELECT COUNT(*) FROM question_reviews
+                        WHERE user_id = :uid AND scheduled_date <= :today
+                          AND completed = FALSE),
+        'leeches', (SELECT COUNT(*) FROM (
+                        SELECT 1 FROM attempts
+                        WHERE user_id = :uid AND correct = FALSE
+                        GROUP BY question_id
+                        HAVING COUNT(*) >= 3)),
+        'weakest', json((SELECT json_object('subject', subject,
+                                            'accuracy', 100.0 * c / t)
+                    FROM (SELECT subject, SUM(correct) as c, COUNT(*) as t
+                          FROM attempts
+                          WHERE user_id = :uid
+                          GROUP BY subject
+                          HAVING t >= 5
+                          ORDER BY 1.0 * c / t ASC
+                          LIMIT 1)))
+    )
+"""
+
+
+# Short TTL per user: the recommendation is advisory, so 30 seconds of
+# staleness is invisible, and record_attempt drops the entry anyway so
+# answering a question refreshes it immediately.
+_RECOMMENDATION_TTL_SECONDS = 30
+_recommendation_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+
+
+def get_smart_recommendation(user_id: int) -> Dict[str, Any]:
+    """Generate a smart 'what to do next' recommendation."""
+    cached = _recommendation_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < _RECOMMENDATION_TTL_SECONDS:
+        return cached[1]
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(_SMART_RECOMMENDATION_SQL,
+                       {'uid': user_id,
+                        'today': datetime.now().strftime('%Y-%m-%d')})
+        counts = _json_loads(cursor.fetchone()[0])
+
+    recommendations = []
+
+    remaining = counts['goal'] - counts['answered_today']
+    if remaining > 0:
+        recommendations.append({
+            "type": "daily_goal",
+            "priority": 1,
+            "message": f"Complete {remaining} more questions to hit your daily goal",
+            "action": "practice"
+        })
+
+    if counts['due_reviews']:
+        recommendations.append({
+            "type": "review_due",
+            "priority": 2,
+            "message": f"You have {counts['due_reviews']} questions scheduled for review today",
+            "action": "review",
+            "count": counts['due_reviews']
+        })
+
+    if counts['leeches']:
+        recommendations.append({
+            "type": "leeches",
+            "priority": 3,
+            "message": f"You have {counts['leeches']} difficult questions that need extra attention",
+            "action": "leech_review",
+            "count": counts['leeches']
+        })
+
+    weakest = counts['weakest']
+    if weakest and weakest['accuracy'] < 70:
+        recommendations.append({
+            "type": "weak_subject",
+            "priority": 4,
+            "message": f"Focus on {weakest['subject']} ({weakest['accuracy']:.0f}% accuracy)",
+            "action": "practice_subject",
+            "subject": weakest['subject']
+        })
+
+    # Already appended in priority order
+    result = {
+        "recommendations": recommendations,
+        "top_recommendation": recommendations[0] if recommendations else None
+    }
+    _recommendation_cache[user_id] = (time.monotonic(), result)
+    return result
+
+
+# The hot per-user statements and representative parameters, for
+# check_query_plans below. Values only need the right types; the planner
+# ignores them.
+_HOT_QUERY_PLANS = {
+    '_USER_STATS_SQL': (_USER_STATS_SQL, (1, 1, 1, 1)),
+    '_FLASHCARD_STATS_SQL': (_FLASHCARD_STATS_SQL,
+                             (1, '2000-01-01', 1, 1, 1, 1)),
+    '_SESSION_QUESTION_IDS_SQL': (_SESSION_QUESTION_IDS_SQL, (1,)),
+    '_RECENT_QUESTION_IDS_SQL': (_RECENT_QUESTION_IDS_SQL, (1, 50)),
+    '_DUE_FLASHCARDS_SQL': (_DUE_FLASHCARDS_SQL, (1, '2000-01-01')),
+}
+
+# Tables large enough that an unindexed scan means a dropped or renamed
+# index. flashcards/questions are deliberately absent: full-deck reads are
+# by design and a few thousand rows.
+_NO_SCAN_TABLES = ('attempts', 'flashcard_reviews', 'flashcard_state',
+                   'sessions', 'question_reviews')
+
+
+def check_query_plans() -> List[str]:
+    """Run EXPLAIN QUERY PLAN over the hot SQL constants and report regressions.
+
+    SQLite silently falls back to full scans when a schema migration drops
+    or renames an index, and nothing else in the app notices until the
+    stats endpoints get slow. Returns a list of human-readable problem
+    descriptions ("<name>: SCAN attempts"), empty when every big table is
+    reached through an index. Run after schema changes, e.g.
+    ``python -c "import database; print(database.check_query_plans())"``.
+    """
+    problems = []
+    with get_read_connection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        for name, (sql, params) in _HOT_QUERY_PLANS.items():
+            for row in cursor.execute("EXPLAIN QUERY PLAN " + sql, params):
+                detail = row[3]
+                if not detail.startswith('SCAN '):
+                    continue
+                scanned = detail.split()[1]
+                if scanned in _NO_SCAN_TABLES and 'USING' not in detail:
+                    problems.append(f"{name}: {detail}")
+    return problems
+
+
+if __name__ == "__main__":
+    print("Initializing database...")
+    init_db()
+    print("Loading questions from JSON files...")
+    load_questions_from_json()
+    print("Loading flashcards from JSON files...")
+    load_flashcards_from_json()
+    for problem in check_query_plans():
+        print(f"Query plan regression: {problem}")
+    print("Database setup complete!")
@@ -1,162 +1,220 @@
-"""
-Script to enhance MCAT question explanations with:
-1. short_reason: Quick memory tip/trick for the correct answer
-2. wrong_answer_explanations: Why each wrong answer is incorrect
-
-This script processes all question JSON files and adds enhanced explanations.
-"""
-
-import json
-import os
-import time
-from pathlib import Path
-import anthropic
-
-# Initialize Claude client
-client = anthropic.Anthropic()
-
-def generate_enhanced_explanation(question: dict) -> dict:
-    """Generate enhanced explanation for a single question using Claude."""
-
-    # Build the prompt
-    options_text = "\n".join([f"{k}: {v}" for k, v in question['options'].items()])
-    correct = question['correct_answer']
-    wrong_options = [k for k in question['options'].keys() if k != correct]
-
-    prompt = f"""You are an MCAT tutor helping students understand why answers are correct or incorrect.
-
-Question: {question['question_text']}
-
-Options:
-{options_text}
-
-Correct Answer: {correct}
-Book Explanation: {question['explanation']}
-
-Please provide:
-
-1. SHORT_REASON: A brief (1-2 sentences) memory tip, trick, or key insight that helps students remember why {correct} is correct. Focus on making it memorable and useful for quick recall. Don't just restate the answer - give a helpful learning tip.
-
-2. WRONG_ANSWER_EXPLANATIONS: For each wrong answer, explain specifically why it's incorrect in 1-2 sentences.
-
-Format your response EXACTLY like this:
-SHORT_REASON: [your tip here]
-
-WRONG_A: [why A is wrong, if A is wrong]
-WRONG_B: [why B is wrong, if B is wrong]
-WRONG_C: [why C is wrong, if C is wrong]
-WRONG_D: [why D is wrong, if D is wrong]
-
-Only include WRONG_X entries for the incorrect options (skip the correct answer)."""
-
-    try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1024,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        response_text = message.content[0].text
-
-        # Parse the response
-        enhanced = {
-            "short_reason": "",
-            "wrong_answer_explanations": {}
-        }
-
-        lines = response_text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("SHORT_REASON:"):
-                enhanced["short_reason"] = line.replace("SHORT_REASON:", "").strip()
-            elif line.startswith("WRONG_A:"):
-                enhanced["wrong_answer_explanations"]["A"] = line.replace("WRONG_A:", "").strip()
-            elif line.startswith("WRONG_B:"):
-                enhanced["wrong_answer_explanations"]["B"] = line.replace("WRONG_B:", "").strip()
-            elif line.startswith("WRONG_C:"):
-                enhanced["wrong_answer_explanations"]["C"] = line.replace("WRONG_C:", "").strip()
-            elif line.startswith("WRONG_D:"):
-                enhanced["wrong_answer_explanations"]["D"] = line.replace("WRONG_D:", "").strip()
-
-        return enhanced
-
-    except Exception as e:
-        print(f"Error generating explanation: {e}")
-        return None
-
-
-def process_question_file(filepath: Path) -> bool:
-    """Process a single question file and add enhanced explanations."""
-
-    print(f"\nProcessing: {filepath.name}")
-
-    with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    questions = data.get('questions', [])
-    total = len(questions)
-
-    for i, question in enumerate(questions):
-        # Skip if already enhanced
-        if 'short_reason' in question and question['short_reason']:
-            print(f"  [{i+1}/{total}] Already enhanced, skipping...")
-            continue
-
-        print(f"  [{i+1}/{total}] Enhancing question {question['id']}...")
-
-        enhanced = generate_enhanced_explanation(question)
-
-        if enhanced:
-            question['short_reason'] = enhanced['short_reason']
-            question['wrong_answer_explanations'] = enhanced['wrong_answer_explanations']
-
-            # Save after each question (in case of interruption)
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        else:
-            print(f"    Failed to enhance question {question['id']}")
-
-        # Rate limiting - be gentle on the API
-        time.sleep(0.5)
-
-    print(f"  Completed {filepath.name}")
-    return True
-
-
-def main():
-    """Process all question files."""
-
-    data_dir = Path(__file__).parent / "data"
-
-    question_files = [
-        "mcat_biology_questions.json",
-        "mcat_biochemistry_questions.json",
-        "mcat_behavioral_sciences_questions.json",
-        "mcat_general_chemistry_questions.json",
-        "mcat_organic_chemistry_questions.json",
-        "mcat_physics_math_questions.json",
-    ]
-
-    print("=" * 60)
-    print("MCAT Question Explanation Enhancer")
-    print("=" * 60)
-    print(f"Processing {len(question_files)} files with 180 questions each")
-    print("Total: 1,080 questions to enhance")
-    print("=" * 60)
-
-    for filename in question_files:
-        filepath = data_dir / filename
-        if filepath.exists():
-            process_question_file(filepath)
-        else:
-            print(f"Warning: {filename} not found")
-
-    print("\n" + "=" * 60)
-    print("Enhancement complete!")
-    print("=" * 60)
-
-
-if __name__ == "__main__":
-    main()
+"""
+Script to enhance MCAT question explanations with:
+1. short_reason: Quick memory tip/trick for the correct answer
+2. wrong_answer_explanations: Why each wrong answer is incorrect
+
+This script processes all question JSON files and adds enhanced explanations.
+Requests run concurrently (bounded by MAX_CONCURRENT_REQUESTS) since wall
+time is dominated by API round-trip latency, not local work.
+"""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+import anthropic
+
+# Initialize Claude client
+client = anthropic.AsyncAnthropic()
+
+# Concurrency bound doubles as rate limiting: with 10 requests in flight
+# the API is kept busy without hammering it.
+MAX_CONCURRENT_REQUESTS = 10
+
+# Static instructions live in the system block with cache_control so the
+# API caches them after the first call; only the per-question fields are
+# re-sent (and re-billed) on the other ~1,079 calls.
+SYSTEM_PROMPT = """You are an MCAT tutor helping students understand why answers are correct or incorrect.
+
+For the question the user provides, please provide:
+
+1. SHORT_REASON: A brief (1-2 sentences) memory tip, trick, or key insight that helps students remember why the correct answer is correct. Focus on making it memorable and useful for quick recall. Don't just restate the answer - give a helpful learning tip.
+
+2. WRONG_ANSWER_EXPLANATIONS: For each wrong answer, explain specifically why it's incorrect in 1-2 sentences.
+
+Format your response EXACTLY like this:
+SHORT_REASON: [your tip here]
+
+WRONG_A: [why A is wrong, if A is wrong]
+WRONG_B: [why B is wrong, if B is wrong]
+WRONG_C: [why C is wrong, if C is wrong]
+WRONG_D: [why D is wrong, if D is wrong]
+
+Only include WRONG_X entries for the incorrect options (skip the correct answer)."""
+
+
+
+async def generate_enhanced_explanation(question: dict) -> dict:
+    """Generate enhanced explanation for a single question using Claude."""
+
+    # Only the per-question fields; the instructions ride in the cached
+    # system block
+    options_text = "\n".join([f"{k}: {v}" for k, v in question['options'].items()])
+
+    prompt = f"""Question: {question['question_text']}
+
+Options:
+{options_text}
+
+Correct Answer: {question['correct_answer']}
+Book Explanation: {question['explanation']}"""
+
+    try:
+        message = await client.messages.create(
+            model="claude-sonnet-4-20250514",
+            max_tokens=1024,
+            system=[{
+                "type": "text",
+                "text": SYSTEM_PROMPT,
+                "cache_control": {"type": "ephemeral"}
+            }],
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+
+        response_text = message.content[0].text
+
+        # Parse the response
+        enhanced = {
+            "short_reason": "",
+            "wrong_answer_explanations": {}
+        }
+
+        lines = response_text.strip().split('\n')
+        for line in lines:
+            line = line.strip()
+            if line.startswith("SHORT_REASON:"):
+                enhanced["short_reason"] = line.replace("SHORT_REASON:", "").strip()
+            elif line.startswith("WRONG_A:"):
+                enhanced["wrong_answer_explanations"]["A"] = line.replace("WRONG_A:", "").strip()
+            elif line.startswith("WRONG_B:"):
+                enhanced["wrong_answer_explanations"]["B"] = line.replace("WRONG_B:", "").strip()
+            elif line.startswith("WRONG_C:"):
+                enhanced["wrong_answer_explanations"]["C"] = line.replace("WRONG_C:", "").strip()
+            elif line.startswith("WRONG_D:"):
+                enhanced["wrong_answer_explanations"]["D"] = line.replace("WRONG_D:", "").strip()
+
+        return enhanced
+
+    except Exception as e:
+        print(f"Error generating explanation: {e}")
+        return None
+
+
+def _save(filepath: Path, data: dict):
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def _replay_sidecar(sidecar: Path, questions: list):
+    """Merge enhancements from an interrupted run back into the questions."""
+    if not sidecar.exists():
+        return
+    by_id = {q['id']: q for q in questions}
+    replayed = 0
+    with open(sidecar, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            question = by_id.get(entry['id'])
+            if question is not None:
+                question['short_reason'] = entry['short_reason']
+                question['wrong_answer_explanations'] = entry['wrong_answer_explanations']
+                replayed += 1
+    if replayed:
+        print(f"  Replayed {replayed} enhancements from {sidecar.name}")
+
+
+async def process_question_file(filepath: Path) -> bool:
+    """Process a single question file and add enhanced explanations."""
+
+    print(f"\nProcessing: {filepath.name}")
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    questions = data.get('questions', [])
+
+    # Crash safety without O(N^2) disk writes: each result is appended to
+    # a sidecar JSONL as it arrives, and the authoritative file is written
+    # once at the end. An interrupted run replays the sidecar instead of
+    # re-requesting the questions it already paid for.
+    sidecar = filepath.with_suffix('.enhancements.jsonl')
+    _replay_sidecar(sidecar, questions)
+
+    pending = [q for q in questions
+               if not ('short_reason' in q and q['short_reason'])]
+    total = len(pending)
+    print(f"  {total} of {len(questions)} questions need enhancing")
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    done_count = 0
+
+    with open(sidecar, 'a', encoding='utf-8') as log:
+
+        async def enhance(question: dict):
+            nonlocal done_count
+            async with semaphore:
+                enhanced = await generate_enhanced_explanation(question)
+
+            if enhanced:
+                question['short_reason'] = enhanced['short_reason']
+                question['wrong_answer_explanations'] = enhanced['wrong_answer_explanations']
+                # Appends run on the event loop thread, so lines never
+                # interleave; flush so a crash loses nothing acknowledged
+                log.write(json.dumps({"id": question['id'], **enhanced},
+                                     ensure_ascii=False) + "\n")
+                log.flush()
+            else:
+                print(f"    Failed to enhance question {question['id']}")
+
+            done_count += 1
+            print(f"  [{done_count}/{total}] {question['id']}")
+
+        await asyncio.gather(*(enhance(q) for q in pending))
+
+    _save(filepath, data)
+    sidecar.unlink()
+
+    print(f"  Completed {filepath.name}")
+    return True
+
+
+async def main():
+    """Process all question files."""
+
+    data_dir = Path(__file__).parent / "data"
+
+    question_files = [
+        "mcat_biology_questions.json",
+        "mcat_biochemistry_questions.json",
+        "mcat_behavioral_sciences_questions.json",
+        "mcat_general_chemistry_questions.json",
+        "mcat_organic_chemistry_questions.json",
+        "mcat_physics_math_questions.json",
+    ]
+
+    print("=" * 60)
+    print("MCAT Question Explanation Enhancer")
+    print("=" * 60)
+    print(f"Processing {len(question_files)} files with 180 questions each")
+    print("Total: 1,080 questions to enhance")
+    print("=" * 60)
+
+    for filename in question_files:
+        filepath = data_dir / filename
+        if filepath.exists():
+            await process_question_file(filepath)
+        else:
+            print(f"Warning: {filename} not found")
+
+    print("\n" + "=" * 60)
+    print("Enhancement complete!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -79,7 +79,7 @@ def select_next_question(
         Selected question dict or None if no questions available
     """
     # Get questions already asked in this session
-    session_questions = set(get_questions_asked_in_session(session_id))
+    session_questions = get_questions_asked_in_session(session_id)
 
     # Get recently asked questions (for mild deprioritization)
     recent_questions = set(get_recent_question_ids(user_id, limit=100))